@@ -0,0 +1,79 @@
+# coding=utf-8
+###########################################################################
+# Parsing of installed addon files for OneLauncher.
+#
+# This doesn't import Qt, so the addon manager's worker processes
+# can import it without starting another GUI.
+#
+# This file is part of OneLauncher
+#
+# OneLauncher is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# OneLauncher is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OneLauncher.  If not, see <http://www.gnu.org/licenses/>.
+###########################################################################
+import defusedxml.minidom
+from OneLauncher.OneLauncherUtils import GetText
+
+# Length of an AddonManager.COLUMN_LIST row without ID
+ROW_LENGTH = 9
+
+
+def getAddonDependencies(dependencies_node):
+    dependencies = ""
+    for node in dependencies_node.childNodes:
+        if node.nodeName == "dependency":
+            dependencies = dependencies + "," + (GetText(node.childNodes))
+    return dependencies[1:]
+
+
+# Returns list of common values for compendium or .plugin files
+def parseCompendiumFile(file, tag):
+    items_row = [""] * ROW_LENGTH
+
+    doc = defusedxml.minidom.parse(file)
+    nodes = doc.getElementsByTagName(tag)[0].childNodes
+    for node in nodes:
+        if node.nodeName == "Name":
+            items_row[0] = GetText(node.childNodes)
+        elif node.nodeName == "Author":
+            items_row[3] = GetText(node.childNodes)
+        elif node.nodeName == "Version":
+            items_row[2] = GetText(node.childNodes)
+        elif node.nodeName == "Id":
+            items_row[6] = GetText(node.childNodes)
+        elif node.nodeName == "Dependencies":
+            items_row[7] = getAddonDependencies(node)
+        elif node.nodeName == "StartupScript":
+            items_row[8] = GetText(node.childNodes)
+    items_row[5] = file
+
+    return items_row
+
+
+def parseCompendiumDescriptors(file):
+    """Returns the descriptor paths listed in .plugincompendium file"""
+    doc = defusedxml.minidom.parse(file)
+    nodes = doc.getElementsByTagName("Descriptors")[0].childNodes
+
+    return [GetText(node.childNodes) for node in nodes if node.nodeName == "descriptor"]
+
+
+def parseAddonFile(file, tag):
+    """
+    Returns dictionary with the parseCompendiumFile row and the plugin
+    descriptors of a compendium or .plugin file
+    """
+    metadata = {"row": parseCompendiumFile(file, tag), "descriptors": []}
+    if file.endswith(".plugincompendium"):
+        metadata["descriptors"] = parseCompendiumDescriptors(file)
+
+    return metadata
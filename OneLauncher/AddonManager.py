@@ -33,14 +33,29 @@ from glob import glob
 from xml.dom import EMPTY_NAMESPACE
 from xml.dom.minidom import Document  # nosec
 import defusedxml.minidom
+import defusedxml.ElementTree
+from xml.etree.ElementTree import ParseError  # nosec
+from xml.parsers.expat import ExpatError  # nosec
 from vkbeautify import xml as prettify_xml
-from OneLauncher.OneLauncherUtils import GetText
+from OneLauncher.OneLauncherUtils import GetText, ArchiveCache
+from OneLauncher.DownloadManager import DownloadManager
+from OneLauncher.AddonFiles import (
+    getAddonDependencies,
+    parseCompendiumFile,
+    parseAddonFile,
+)
 import sqlite3
-from shutil import rmtree, copy, move
-from zipfile import ZipFile
+from shutil import rmtree, copy, copyfileobj
+from tempfile import mkdtemp
+from zipfile import ZipFile, BadZipFile, is_zipfile
 import urllib
-from time import strftime, localtime
+from time import strftime, localtime, time, monotonic
+from contextlib import contextmanager
 import logging
+import json
+import uuid
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 
 class AddonManager:
@@ -70,12 +85,77 @@ class AddonManager:
         "tableSkinsDDO",
         "tableSkinsDDOInstalled",
     ]
+    # Normal tables used to sync the remote addons tables and scan installed
+    # addons incrementally. Keys are table names and values are their columns.
+    NORMAL_TABLES = {
+        "tableCatalogSync": ["TableName", "ETag", "LastModified", "LastSync"],
+        "tableCatalogAddons": [
+            "TableName",
+            "InterfaceID",
+            "FTSRowid",
+            "UIVersion",
+            "UIUpdated",
+            "Installed",
+            "Outdated",
+        ],
+        "tableAddonFiles": ["Path", "MTime", "Size", "Tag", "Metadata"],
+        "tableAddonDependencies": [
+            "TableName",
+            "AddonRowid",
+            "InterfaceID",
+            "Dependency",
+        ],
+    }
 
     PLUGINS_URL = "https://api.lotrointerface.com/fav/OneLauncher-Plugins.xml"
     SKINS_URL = "https://api.lotrointerface.com/fav/OneLauncher-Themes.xml"
     MUSIC_URL = "https://api.lotrointerface.com/fav/OneLauncher-Music.xml"
     SKINS_DDO_URL = "https://api.lotrointerface.com/fav/OneLauncher-Themes-DDO.xml"
 
+    # Columns searched by words that don't have a column filter
+    SEARCH_COLUMNS = ["Name", "Author", "Category"]
+    # Search words like author:someone only match the column of their prefix
+    SEARCH_FILTERS = {
+        "name": "Name",
+        "author": "Author",
+        "category": "Category",
+        "version": "Version",
+    }
+
+    # Placeholders for a full row of COLUMN_LIST without ID
+    ROW_PLACEHOLDERS = ",".join("?" * (len(COLUMN_LIST) - 1))
+
+    # Number of changed addon files needed before they are parsed in a process
+    # pool. A file takes about 0.2 ms to parse and a spawned worker about 0.5 s
+    # to start, so the pool is only faster past about 2,500 files even with many
+    # CPUs. See benchmarks/addon_files_parse_benchmark.py.
+    PARALLEL_PARSE_MIN_FILES = 3000
+    # With one CPU the workers only add their start up time
+    PARALLEL_PARSE_MIN_CPUS = 2
+
+    # Bytes of downloaded addon archives kept for reinstalls
+    ARCHIVE_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+    # Milliseconds without changes to addon folders before installed tables are updated
+    ADDON_FOLDERS_CHANGE_DELAY = 500
+
+    # Number of remote addons written to the database at once while syncing
+    SYNC_BATCH_SIZE = 500
+
+    # Folders that addon archives sometimes put addons in, but that aren't
+    # part of the installed addon's path
+    INVALID_FOLDER_NAMES = [
+        "ui",
+        "skins",
+        "Plugins",
+        "Music",
+        "My Documents",
+        "Documents",
+        "The Lord of the Rings Online",
+        "Dungeons and Dragons Online",
+        "Dungeons & Dragons Online",
+    ]
+
     def __init__(
         self,
         currentGame,
@@ -92,6 +172,13 @@ class AddonManager:
         self.logger = logging.getLogger("OneLauncher")
         self.startupScripts = startupScripts
 
+        # Normalised plugin descriptor path is the key and the
+        # .plugincompendium file the descriptor is from is the value
+        self.plugin_descriptor_compendiums = {}
+        # .plugincompendium file is the key and a list of its descriptor paths
+        # is the value
+        self.compendium_plugin_descriptors = {}
+
         ui_file = QtCore.QFile(os.path.join(data_folder, "ui", "winAddonManager.ui"))
 
         ui_file.open(QtCore.QFile.ReadOnly)
@@ -207,19 +294,28 @@ class AddonManager:
         self.winAddonManager.btnLog.clicked.connect(self.btnLogClicked)
 
         self.winAddonManager.txtSearchBar.setFocus()
+        self.addon_search = AddonSearch(self, self.winAddonManager)
         self.winAddonManager.txtSearchBar.textChanged.connect(
-            self.txtSearchBarTextChanged
+            self.addon_search.searchLater
         )
 
         for table in self.TABLE_LIST[:-2]:
             # Gets callable form from the string
             table = getattr(self.winAddonManager, table)
 
+            table.setModel(
+                AddonsTableModel(
+                    self.installed_addons_color,
+                    not table.objectName().endswith("Installed"),
+                    table,
+                )
+            )
+
             # Hides ID column
             table.hideColumn(0)
 
             # Sort tables by addon name
-            table.sortItems(1)
+            table.sortByColumn(1, QtCore.Qt.AscendingOrder)
 
         self.openDB()
 
@@ -240,12 +336,246 @@ class AddonManager:
             # Loads in installed plugins
             self.getInstalledPlugins()
 
+        self.watchAddonDataFolders()
+
+        # Shared by all games, so an addon is only downloaded once for all of them
+        self.archive_cache = ArchiveCache(
+            os.path.join(self.settingsDir, "addon_archives"),
+            self.ARCHIVE_CACHE_MAX_SIZE,
+        )
+
+        # Batch ID is the key and the batch dictionary from
+        # installRemoteAddonsWithDependencies is the value
+        self.install_batches = {}
+        # Batches that were merged into another one are the keys and the
+        # batch they were merged into is the value
+        self.merged_batch_IDs = {}
+        # Download path is the key and the batch it was attached to is the
+        # value for downloads queued by earlier sessions
+        self.download_batch_IDs = {}
+        # InterfaceIDs of the batch being installed
+        self.installing_IDs = set()
+        # Finished downloads from earlier sessions. They are only
+        # installed once the user agrees.
+        self.resumed_downloads = []
+
+        self.download_manager = DownloadManager(
+            os.path.join(self.settingsDir, "addon_downloads.json"),
+            self.winAddonManager,
+        )
+        self.download_manager.ReturnProgress.connect(
+            self.winAddonManager.progressBar.setValue
+        )
+        self.download_manager.ReturnDownloadFinished.connect(self.downloadFinished)
+        self.download_manager.ReturnDownloadFailed.connect(self.downloadFailed)
+        self.download_manager.ReturnQueueFinished.connect(self.downloadsFinished)
+        # Downloads that didn't finish last time. Ones for the data folder of
+        # another game are dropped.
+        self.download_manager.resume(
+            lambda download: download.get("data_folder") == self.data_folder
+        )
+
+    def getAddonDataFolders(self):
+        """Returns dictionary of addon data folders and their installed tables"""
+        if self.currentGame.startswith("DDO"):
+            return {self.data_folder_skins: self.winAddonManager.tableSkinsInstalled}
+        else:
+            return {
+                self.data_folder_plugins: self.winAddonManager.tablePluginsInstalled,
+                self.data_folder_skins: self.winAddonManager.tableSkinsInstalled,
+                self.data_folder_music: self.winAddonManager.tableMusicInstalled,
+            }
+
+    def watchAddonDataFolders(self):
+        """
+        Keeps installed tables up to date with changes made outside of
+        OneLauncher. Data folders and all the folders in them are watched,
+        and changes are applied once they stop for ADDON_FOLDERS_CHANGE_DELAY.
+        """
+        self.addon_folders_watcher = QtCore.QFileSystemWatcher(self.winAddonManager)
+        self.addon_folders_watcher.directoryChanged.connect(self.addonFolderChanged)
+
+        self.addon_folders_timer = QtCore.QTimer(self.winAddonManager)
+        self.addon_folders_timer.setSingleShot(True)
+        self.addon_folders_timer.setInterval(self.ADDON_FOLDERS_CHANGE_DELAY)
+        self.addon_folders_timer.timeout.connect(self.updateChangedAddonFolders)
+
+        self.changed_addon_folders = set()
+        # Number of ignoreAddonFolderChanges blocks being run and the
+        # monotonic() time until changes are ignored after the last one
+        self.addon_folder_writes = 0
+        self.ignore_addon_folder_changes_until = 0
+        # Data folder is the key and a set of its addon folder names is the value
+        self.watched_addon_folders = {}
+        for data_folder in self.getAddonDataFolders():
+            os.makedirs(data_folder, exist_ok=True)
+            data_folder = os.path.normpath(data_folder)
+            self.addon_folders_watcher.addPath(data_folder)
+            self.watched_addon_folders[data_folder] = set()
+            self.watchAddonFolders(data_folder)
+
+    def watchAddonFolders(self, data_folder):
+        """
+        Starts watching new addon folders in data_folder. Returns
+        names of addon folders that were added or removed.
+        """
+        addon_folders = {
+            os.path.basename(os.path.normpath(folder))
+            for folder in glob(os.path.join(data_folder, "*", ""))
+        }
+        changed_folders = addon_folders ^ self.watched_addon_folders[data_folder]
+
+        self.watchAddonFolderTrees(
+            data_folder, addon_folders - self.watched_addon_folders[data_folder]
+        )
+        # Removed folders stop being watched on their own
+        self.watched_addon_folders[data_folder] = addon_folders
+
+        return changed_folders
+
+    def watchAddonFolderTrees(self, data_folder, folders):
+        """
+        Starts watching folders in data_folder and every folder in them
+        that isn't watched yet
+        """
+        watched_paths = set(self.addon_folders_watcher.directories())
+        new_paths = []
+        for folder in folders:
+            for path, _, _ in os.walk(os.path.join(data_folder, folder)):
+                if path not in watched_paths:
+                    new_paths.append(path)
+
+        if new_paths:
+            self.addon_folders_watcher.addPaths(new_paths)
+
+    @contextmanager
+    def ignoreAddonFolderChanges(self):
+        """
+        Ignores changes to the data folders made inside the with block.
+        OneLauncher updates the installed tables itself after installing or
+        uninstalling addons. Changes are reported after they happen, so they
+        are also ignored for ADDON_FOLDERS_CHANGE_DELAY after the block.
+        """
+        self.addon_folder_writes += 1
+        try:
+            yield
+        finally:
+            self.addon_folder_writes -= 1
+            self.ignore_addon_folder_changes_until = (
+                monotonic() + self.ADDON_FOLDERS_CHANGE_DELAY / 1000
+            )
+
+            # New folders are watched for changes made outside of OneLauncher
+            if not self.addon_folder_writes:
+                for data_folder in self.watched_addon_folders:
+                    self.watchAddonFolders(data_folder)
+
+    def addonFolderChanged(self, path):
+        if (
+            self.addon_folder_writes
+            or monotonic() < self.ignore_addon_folder_changes_until
+        ):
+            return
+
+        self.changed_addon_folders.add(os.path.normpath(path))
+
+        # Bursts of changes like extracting an addon are applied together
+        self.addon_folders_timer.start()
+
+    def updateChangedAddonFolders(self):
+        changed_paths = self.changed_addon_folders
+        self.changed_addon_folders = set()
+
+        for data_folder, table in self.getAddonDataFolders().items():
+            data_folder = os.path.normpath(data_folder)
+
+            # Changes anywhere in an addon folder update the whole addon folder
+            folders = set()
+            for path in changed_paths:
+                relative_path = os.path.relpath(path, data_folder)
+                if relative_path != os.curdir and not relative_path.startswith(
+                    os.pardir
+                ):
+                    folders.add(relative_path.split(os.sep)[0])
+            self.watchAddonFolderTrees(data_folder, folders)
+
+            if data_folder in changed_paths:
+                folders.update(self.watchAddonFolders(data_folder))
+
+                # .abc files are directly in the music folder
+                if table is self.winAddonManager.tableMusicInstalled:
+                    self.clearTable(table)
+                    self.getInstalledMusic()
+                    self.updateRemoteAddonsInstalledStatus(table)
+                    continue
+
+            if folders:
+                self.updateInstalledAddonFolders(data_folder, table, folders)
+                self.updateRemoteAddonsInstalledStatus(table)
+
+    def updateRemoteAddonsInstalledStatus(self, table):
+        """
+        Updates which remote addons are marked as installed after addons
+        in installed table were added or removed outside of OneLauncher
+        """
+        table_remote = self.getRemoteOrLocalTableFromOne(table, remote=True)
+        with self.conn:
+            self.c.execute(
+                "UPDATE tableCatalogAddons SET Installed = 0, Outdated = 0 WHERE"  # nosec
+                " TableName = ? AND Installed = 1 AND InterfaceID NOT IN"
+                " (SELECT InterfaceID FROM {table})".format(table=table.objectName()),
+                (table_remote.objectName(),),
+            )
+            self.c.execute(
+                "UPDATE tableCatalogAddons SET Installed = 1 WHERE"  # nosec
+                " TableName = ? AND Installed = 0 AND InterfaceID IN"
+                " (SELECT InterfaceID FROM {table})".format(table=table.objectName()),
+                (table_remote.objectName(),),
+            )
+
+        if not self.isTableEmpty(table_remote):
+            self.reloadSearch(table_remote)
+
+    def updateInstalledAddonFolders(self, data_folder, table, folders):
+        """Reads the addons in folders of data_folder into table again"""
+        if table is self.winAddonManager.tablePluginsInstalled:
+            get_installed_function = self.getInstalledPlugins
+        elif table is self.winAddonManager.tableSkinsInstalled:
+            get_installed_function = self.getInstalledSkins
+        else:
+            get_installed_function = self.getInstalledMusic
+
+        # Tables that haven't been loaded yet are read in full
+        if self.isTableEmpty(table):
+            get_installed_function()
+            return
+
+        with self.conn:
+            for folder in folders:
+                path = os.path.join(data_folder, folder)
+                self.deleteInstalledAddonRows(
+                    table,
+                    "File = ? OR substr(File, 1, ?) = ?",
+                    (path, len(path) + 1, path + os.sep),
+                )
+
+        existing_folders = [
+            folder
+            for folder in folders
+            if os.path.isdir(os.path.join(data_folder, folder))
+        ]
+        if existing_folders:
+            get_installed_function(existing_folders)
+        else:
+            self.reloadSearch(table)
+
     def getInstalledSkins(self, folders_list=None):
         if self.isTableEmpty(self.winAddonManager.tableSkinsInstalled):
             folders_list = None
 
         os.makedirs(self.data_folder_skins, exist_ok=True)
 
+        full_scan = not folders_list
         if not folders_list:
             folders_list = glob(os.path.join(self.data_folder_skins, "*", ""))
         else:
@@ -264,24 +594,19 @@ class AddonManager:
                     skins_list.remove(folder)
                     break
 
+        if full_scan:
+            self.pruneAddonFilesIndex(self.data_folder_skins, skins_list_compendium)
+
         self.addInstalledSkinsToDB(skins_list, skins_list_compendium)
 
     def addInstalledSkinsToDB(self, skins_list, skins_list_compendium):
         table = self.winAddonManager.tableSkinsInstalled
 
-        # Clears rows from db table if needed (This function is called to add
-        # newly installed skins after initial load as well)
-        if self.isTableEmpty(table):
-            self.c.execute(
-                "DELETE FROM {table}".format(table=table.objectName())  # nosec
-            )
+        files_metadata = self.getAddonFilesMetadata(
+            [(skin, "SkinConfig") for skin in skins_list_compendium]
+        )
 
-        for skin in skins_list_compendium:
-            items_row = self.parseCompendiumFile(skin, "SkinConfig")
-            items_row = self.getOnlineAddonInfo(
-                items_row, self.winAddonManager.tableSkins.objectName()
-            )
-            self.addRowToDB(table, items_row)
+        rows = [files_metadata[skin]["row"] for skin in skins_list_compendium]
 
         for skin in skins_list:
             items_row = [""] * (len(self.COLUMN_LIST) - 1)
@@ -290,7 +615,15 @@ class AddonManager:
             items_row[5] = skin
             items_row[1] = "Unmanaged"
 
-            self.addRowToDB(table, items_row)
+            rows.append(items_row)
+
+        with self.conn:
+            # Clears rows from db table if needed (This function is called to add
+            # newly installed skins after initial load as well)
+            if self.isTableEmpty(table):
+                self.deleteInstalledAddonRows(table)
+            self.addInstalledAddonRowsToDB(table, rows)
+            self.addOnlineAddonInfo(table, self.winAddonManager.tableSkins)
 
         # Populate user visible table
         self.reloadSearch(self.winAddonManager.tableSkinsInstalled)
@@ -301,6 +634,7 @@ class AddonManager:
 
         os.makedirs(self.data_folder_music, exist_ok=True)
 
+        full_scan = not folders_list
         if not folders_list:
             folders_list = glob(os.path.join(self.data_folder_music, "*", ""))
         else:
@@ -325,20 +659,19 @@ class AddonManager:
             if file.endswith(".abc"):
                 music_list.append(os.path.join(self.data_folder_music, file))
 
+        if full_scan:
+            self.pruneAddonFilesIndex(self.data_folder_music, music_list_compendium)
+
         self.addInstalledMusicToDB(music_list, music_list_compendium)
 
     def addInstalledMusicToDB(self, music_list, music_list_compendium):
         table = self.winAddonManager.tableMusicInstalled
 
-        # Clears rows from db table if needed (This function is called
-        # to add newly installed music after initial load as well)
-        if self.isTableEmpty(table):
-            self.c.execute("DELETE FROM tableMusicInstalled")
+        files_metadata = self.getAddonFilesMetadata(
+            [(music, "MusicConfig") for music in music_list_compendium]
+        )
 
-        for music in music_list_compendium:
-            items_row = self.parseCompendiumFile(music, "MusicConfig")
-            items_row = self.getOnlineAddonInfo(items_row, "tableMusic")
-            self.addRowToDB(table, items_row)
+        rows = [files_metadata[music]["row"] for music in music_list_compendium]
 
         for music in music_list:
             items_row = [""] * (len(self.COLUMN_LIST) - 1)
@@ -361,7 +694,15 @@ class AddonManager:
             items_row[5] = music
             items_row[1] = "Unmanaged"
 
-            self.addRowToDB(table, items_row)
+            rows.append(items_row)
+
+        with self.conn:
+            # Clears rows from db table if needed (This function is called
+            # to add newly installed music after initial load as well)
+            if self.isTableEmpty(table):
+                self.deleteInstalledAddonRows(table)
+            self.addInstalledAddonRowsToDB(table, rows)
+            self.addOnlineAddonInfo(table, self.winAddonManager.tableMusic)
 
         # Populate user visible table
         self.reloadSearch(table)
@@ -371,6 +712,7 @@ class AddonManager:
             folders_list = None
         os.makedirs(self.data_folder_plugins, exist_ok=True)
 
+        full_scan = not folders_list
         if not folders_list:
             folders_list = glob(os.path.join(self.data_folder_plugins, "*", ""))
         else:
@@ -391,6 +733,20 @@ class AddonManager:
                 elif file.endswith(".plugin"):
                     plugins_list.append(file)
 
+        if full_scan:
+            self.pruneAddonFilesIndex(
+                self.data_folder_plugins, plugins_list_compendium + plugins_list
+            )
+            self.plugin_descriptor_compendiums.clear()
+            self.compendium_plugin_descriptors.clear()
+        else:
+            # Compendiums in the scanned folders may have been removed
+            scanned_folders = {self.getPluginPathKey(folder) for folder in folders_list}
+            for compendium in list(self.compendium_plugin_descriptors):
+                folder = self.getPluginPathKey(os.path.dirname(compendium))
+                if folder in scanned_folders:
+                    self.forgetCompendiumDescriptors(compendium)
+
         (plugins_list, plugins_list_compendium,) = self.removeManagedPluginsFromList(
             plugins_list, plugins_list_compendium
         )
@@ -398,107 +754,264 @@ class AddonManager:
         self.addInstalledPluginsToDB(plugins_list, plugins_list_compendium)
 
     def removeManagedPluginsFromList(self, plugins_list, plugins_list_compendium):
-        for plugin in plugins_list_compendium:
-            doc = defusedxml.minidom.parse(plugin)
-            nodes = doc.getElementsByTagName("Descriptors")[0].childNodes
-
-            for node in nodes:
-                if node.nodeName == "descriptor":
-                    descriptor_path = os.path.join(
-                        self.data_folder_plugins,
-                        (GetText(node.childNodes).replace("\\", os.sep)),
-                    )
-                    try:
-                        plugins_list.remove(descriptor_path)
-                    except ValueError:
-                        if not os.path.exists(descriptor_path):
-                            self.addLog(plugin + " has misconfigured descriptors")
+        """
+        Returns plugins_list without the .plugin files that are descriptors of
+        a compendium in plugins_list_compendium, and plugins_list_compendium.
+        """
+        self.reconcilePluginDescriptors(plugins_list, plugins_list_compendium)
+
+        managed_plugins = set()
+        for compendium in plugins_list_compendium:
+            managed_plugins.update(
+                self.getPluginPathKey(descriptor)
+                for descriptor in self.compendium_plugin_descriptors[compendium]
+            )
+        plugins_list = [
+            plugin
+            for plugin in plugins_list
+            if self.getPluginPathKey(plugin) not in managed_plugins
+        ]
 
         return plugins_list, plugins_list_compendium
 
+    def reconcilePluginDescriptors(self, plugins_list, plugins_list_compendium):
+        """
+        Records the descriptors of the compendiums in plugins_list_compendium
+        in plugin_descriptor_compendiums and compendium_plugin_descriptors.
+        Descriptors that aren't in plugins_list and don't exist either are
+        logged together.
+        """
+        files_metadata = self.getAddonFilesMetadata(
+            [(compendium, "PluginConfig") for compendium in plugins_list_compendium]
+        )
+        plugins = {self.getPluginPathKey(plugin) for plugin in plugins_list}
+
+        misconfigured_compendiums = []
+        for compendium in plugins_list_compendium:
+            self.forgetCompendiumDescriptors(compendium)
+
+            descriptor_paths = [
+                os.path.join(
+                    self.data_folder_plugins, descriptor.replace("\\", os.sep)
+                )
+                for descriptor in files_metadata[compendium]["descriptors"]
+            ]
+            self.compendium_plugin_descriptors[compendium] = descriptor_paths
+
+            misconfigured = False
+            for descriptor_path in descriptor_paths:
+                descriptor_key = self.getPluginPathKey(descriptor_path)
+                self.plugin_descriptor_compendiums[descriptor_key] = compendium
+
+                # Only descriptors outside of the scanned plugins need a file check
+                if descriptor_key not in plugins and not os.path.exists(
+                    descriptor_path
+                ):
+                    misconfigured = True
+            if misconfigured:
+                misconfigured_compendiums.append(compendium)
+
+        if misconfigured_compendiums:
+            self.addLog(
+                "Plugin compendiums with misconfigured descriptors:\n"
+                + "\n".join(misconfigured_compendiums)
+            )
+
+    def forgetCompendiumDescriptors(self, compendium):
+        for descriptor_path in self.compendium_plugin_descriptors.pop(compendium, []):
+            descriptor_key = self.getPluginPathKey(descriptor_path)
+            if self.plugin_descriptor_compendiums.get(descriptor_key) == compendium:
+                del self.plugin_descriptor_compendiums[descriptor_key]
+
+    def getPluginPathKey(self, path):
+        """Returns path normalised for comparing plugin paths"""
+        return os.path.normcase(os.path.normpath(path))
+
+    def getCompendiumPluginFiles(self, compendium):
+        """Returns the .plugin files described by .plugincompendium file"""
+        if compendium not in self.compendium_plugin_descriptors:
+            self.reconcilePluginDescriptors([], [compendium])
+
+        return self.compendium_plugin_descriptors[compendium]
+
+    def getPluginCompendium(self, plugin):
+        """
+        Returns the .plugincompendium file that has .plugin file as
+        a descriptor or None if it is unmanaged
+        """
+        return self.plugin_descriptor_compendiums.get(self.getPluginPathKey(plugin))
+
+    def getManagedPluginAddon(self, addon):
+        """
+        Returns addon with its .plugin file replaced by the compendium that
+        manages it, so the whole compendium is uninstalled or updated
+        """
+        if not addon[1] or not addon[1].endswith(".plugin"):
+            return addon
+
+        compendium = self.getPluginCompendium(addon[1])
+        if not compendium:
+            return addon
+
+        interface_id = self.getAddonFilesMetadata([(compendium, "PluginConfig")])[
+            compendium
+        ]["row"][6]
+        return (interface_id or addon[0], compendium, addon[2])
+
     def addInstalledPluginsToDB(self, plugins_list, plugins_list_compendium):
         table = self.winAddonManager.tablePluginsInstalled
 
-        # Clears rows from db table if needed (This function is called to
-        # add newly installed plugins after initial load as well)
-        if self.isTableEmpty(table):
-            self.c.execute("DELETE FROM tablePluginsInstalled")
+        # Sets tag for plugin file xml search
+        files_metadata = self.getAddonFilesMetadata(
+            [(plugin, "PluginConfig") for plugin in plugins_list_compendium]
+            + [(plugin, "Information") for plugin in plugins_list]
+        )
 
+        rows = []
         for plugin in plugins_list_compendium + plugins_list:
-            # Sets tag for plugin file xml search and category for unmanaged plugins
-            if plugin.endswith(".plugincompendium"):
-                items_row = self.parseCompendiumFile(plugin, "PluginConfig")
-                items_row = self.getOnlineAddonInfo(items_row, "tablePlugins")
-            else:
-                items_row = self.parseCompendiumFile(plugin, "Information")
+            items_row = files_metadata[plugin]["row"]
+            # Sets category for unmanaged plugins
+            if plugin.endswith(".plugin"):
                 items_row[1] = "Unmanaged"
 
-            self.addRowToDB(table, items_row)
+            rows.append(items_row)
+
+        with self.conn:
+            # Clears rows from db table if needed (This function is called to
+            # add newly installed plugins after initial load as well)
+            if self.isTableEmpty(table):
+                self.deleteInstalledAddonRows(table)
+            self.addInstalledAddonRowsToDB(table, rows)
+            self.addOnlineAddonInfo(table, self.winAddonManager.tablePlugins)
 
         # Populate user visible table
         self.reloadSearch(self.winAddonManager.tablePluginsInstalled)
 
-    def getAddonDependencies(self, dependencies_node):
-        dependencies = ""
-        for node in dependencies_node.childNodes:
-            if node.nodeName == "dependency":
-                dependencies = dependencies + "," + (GetText(node.childNodes))
-        return dependencies[1:]
-
-    # Returns list of common values for compendium or .plugin files
-    def parseCompendiumFile(self, file, tag):
-        items_row = [""] * (len(self.COLUMN_LIST) - 1)
-
-        doc = defusedxml.minidom.parse(file)
-        nodes = doc.getElementsByTagName(tag)[0].childNodes
-        for node in nodes:
-            if node.nodeName == "Name":
-                items_row[0] = GetText(node.childNodes)
-            elif node.nodeName == "Author":
-                items_row[3] = GetText(node.childNodes)
-            elif node.nodeName == "Version":
-                items_row[2] = GetText(node.childNodes)
-            elif node.nodeName == "Id":
-                items_row[6] = GetText(node.childNodes)
-            elif node.nodeName == "Dependencies":
-                items_row[7] = self.getAddonDependencies(node)
-            elif node.nodeName == "StartupScript":
-                items_row[8] = GetText(node.childNodes)
-        items_row[5] = file
-
-        return items_row
-
-    def getOnlineAddonInfo(self, items_row, remote_addons_table):
-        for info in self.c.execute(
-            "SELECT Category, LatestRelease FROM {table} WHERE InterfaceID == ?".format(  # nosec
-                table=remote_addons_table
-            ),
-            (items_row[6],),
+    def getAddonFilesMetadata(self, files_tags):
+        """
+        Returns dictionary of file path to parseAddonFile result for
+        (file, tag) pairs. Results are kept in tableAddonFiles, and files
+        are only parsed again when their modification time or size changed.
+        Many changed files are parsed in a process pool, and the results
+        are stored in batches as they come in.
+        """
+        files_metadata = {}
+        changed_files = []
+        for file, tag in files_tags:
+            file_stat = os.stat(file)
+            file_info = (file_stat.st_mtime_ns, file_stat.st_size, tag)
+            for entry in self.c.execute(
+                "SELECT MTime, Size, Tag, Metadata FROM tableAddonFiles WHERE Path = ?",
+                (file,),
+            ):
+                if entry[:3] == file_info:
+                    files_metadata[file] = json.loads(entry[3])
+
+            if file not in files_metadata:
+                changed_files.append((file,) + file_info)
+
+        if not changed_files:
+            return files_metadata
+
+        files = [changed_file[0] for changed_file in changed_files]
+        tags = [changed_file[3] for changed_file in changed_files]
+        if (
+            len(changed_files) < self.PARALLEL_PARSE_MIN_FILES
+            or (os.cpu_count() or 1) < self.PARALLEL_PARSE_MIN_CPUS
         ):
-            items_row[1] = info[0]
-            items_row[4] = info[1]
+            executor = None
+            results = map(parseAddonFile, files, tags)
+        else:
+            # Forking copies locks held by the Qt, search and download threads
+            executor = ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            # Chunks keep the overhead of sending files to workers low
+            chunksize = max(len(files) // ((os.cpu_count() or 1) * 4), 1)
+            results = executor.map(parseAddonFile, files, tags, chunksize=chunksize)
 
-        # Unmanaged if not in online cache
-        if not items_row[1]:
-            items_row[1] = "Unmanaged"
+        try:
+            with self.conn:
+                index_rows = []
+                for changed_file, metadata in zip(changed_files, results):
+                    files_metadata[changed_file[0]] = metadata
+                    index_rows.append(changed_file + (json.dumps(metadata),))
+
+                    if len(index_rows) >= self.SYNC_BATCH_SIZE:
+                        self.addAddonFilesToIndex(index_rows)
+                        index_rows = []
+                self.addAddonFilesToIndex(index_rows)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        return files_metadata
+
+    def addAddonFilesToIndex(self, index_rows):
+        self.c.executemany(
+            "INSERT OR REPLACE INTO tableAddonFiles VALUES(?, ?, ?, ?, ?)",
+            index_rows,
+        )
+
+    def pruneAddonFilesIndex(self, folder, files):
+        """Removes files in folder that aren't in files from tableAddonFiles"""
+        folder = os.path.join(folder, "")
+        indexed_files = {
+            entry[0]
+            for entry in self.c.execute(
+                "SELECT Path FROM tableAddonFiles WHERE substr(Path, 1, ?) = ?",
+                (len(folder), folder),
+            )
+        }
+        self.c.executemany(
+            "DELETE FROM tableAddonFiles WHERE Path = ?",
+            [(file,) for file in indexed_files.difference(files)],
+        )
+
+    def addOnlineAddonInfo(self, table, table_remote):
+        """
+        Fills in category and latest release of the addons that were just
+        added to table from table_remote. Remote addons are found through the
+        InterfaceID index of tableCatalogAddons, so this is one join instead of
+        a search of table_remote for every addon.
+        """
+        self.c.execute(
+            "UPDATE {table} SET (Category, LatestRelease) = (SELECT"  # nosec
+            " remote.Category, remote.LatestRelease FROM tableCatalogAddons AS"
+            " catalog JOIN {table_remote} AS remote ON remote.rowid ="
+            " catalog.FTSRowid WHERE catalog.TableName = ? AND"
+            " catalog.InterfaceID = {table}.InterfaceID) WHERE Category = '' AND"
+            " InterfaceID IN (SELECT InterfaceID FROM tableCatalogAddons WHERE"
+            " TableName = ?)".format(
+                table=table.objectName(), table_remote=table_remote.objectName()
+            ),
+            (table_remote.objectName(), table_remote.objectName()),
+        )
 
-        return items_row
+        # Unmanaged if not in online cache
+        self.c.execute(
+            "UPDATE {table} SET Category = 'Unmanaged' WHERE Category = ''".format(  # nosec
+                table=table.objectName()
+            )
+        )
 
     def openDB(self):
         """
         Opens addons_cache database and creates new database if 
         one doesn't exist or the current one has an outdated structure
         """
-        addons_cache_db_path = os.path.join(self.settingsDir, "addons_cache.sqlite")
-        if os.path.exists(addons_cache_db_path):
+        self.addons_cache_db_path = os.path.join(
+            self.settingsDir, "addons_cache.sqlite"
+        )
+        if os.path.exists(self.addons_cache_db_path):
             # Connects to addons_cache database
-            self.conn = sqlite3.connect(addons_cache_db_path)
+            self.conn = self.connectDB()
             self.c = self.conn.cursor()
 
             # Replace old database if its structure is out of date
             if self.isCurrentDBOutdated():
                 self.closeDB()
-                os.remove(addons_cache_db_path)
+                os.remove(self.addons_cache_db_path)
                 self.createDB()
         else:
             self.createDB()
@@ -514,7 +1027,7 @@ class AddonManager:
         for column_data in self.c.execute(
             "SELECT m.name as tableName, p.name as columnName FROM sqlite_master"
             " m left outer join pragma_table_info((m.name)) p on m.name <>"
-            " p.name ORDER BY tableName, columnName"
+            " p.name WHERE m.type = 'table' ORDER BY tableName, columnName"
         ):
             # Ignore tables without actual information
             if column_data[0].endswith(
@@ -527,9 +1040,12 @@ class AddonManager:
             else:
                 tables_dict[column_data[0]] = [column_data[1]]
 
-        for table in self.TABLE_LIST:
+        expected_tables = {table: self.COLUMN_LIST[1:] for table in self.TABLE_LIST}
+        expected_tables.update(self.NORMAL_TABLES)
+
+        for table, columns in expected_tables.items():
             if table in tables_dict:
-                for column in self.COLUMN_LIST[1:]:
+                for column in columns:
                     try:
                         tables_dict[table].remove(column)
                     except ValueError:
@@ -550,9 +1066,7 @@ class AddonManager:
 
     def createDB(self):
         """Creates ans sets up addons_cache database"""
-        self.conn = sqlite3.connect(
-            os.path.join(self.settingsDir, "addons_cache.sqlite")
-        )
+        self.conn = self.connectDB()
         self.c = self.conn.cursor()
 
         for table in self.TABLE_LIST:
@@ -572,6 +1086,54 @@ class AddonManager:
                 )
             )
 
+        self.c.execute(
+            "CREATE TABLE tableCatalogSync(TableName TEXT PRIMARY KEY, ETag TEXT,"
+            " LastModified TEXT, LastSync REAL)"
+        )
+        self.c.execute(
+            "CREATE TABLE tableCatalogAddons(TableName TEXT, InterfaceID TEXT,"
+            " FTSRowid INTEGER, UIVersion TEXT, UIUpdated TEXT,"
+            " Installed INTEGER NOT NULL DEFAULT 0,"
+            " Outdated INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (TableName, InterfaceID))"
+        )
+        self.c.execute(
+            "CREATE INDEX indexCatalogAddonsStatus ON"
+            " tableCatalogAddons(TableName, Installed, Outdated)"
+        )
+        self.c.execute(
+            "CREATE TABLE tableAddonFiles(Path TEXT PRIMARY KEY, MTime INTEGER,"
+            " Size INTEGER, Tag TEXT, Metadata TEXT)"
+        )
+        # One row for each dependency of each installed addon. AddonRowid is
+        # the rowid of the addon in its installed addons table.
+        self.c.execute(
+            "CREATE TABLE tableAddonDependencies(TableName TEXT, AddonRowid INTEGER,"
+            " InterfaceID TEXT, Dependency TEXT,"
+            " PRIMARY KEY (TableName, AddonRowid, Dependency)) WITHOUT ROWID"
+        )
+        self.c.execute(
+            "CREATE INDEX indexAddonDependenciesAddon ON"
+            " tableAddonDependencies(TableName, InterfaceID)"
+        )
+        self.c.execute(
+            "CREATE INDEX indexAddonDependenciesDependency ON"
+            " tableAddonDependencies(TableName, Dependency, InterfaceID)"
+        )
+
+    def connectDB(self, check_same_thread=True):
+        """Returns a new connection to the addons_cache database"""
+        conn = sqlite3.connect(
+            self.addons_cache_db_path,
+            timeout=30,
+            check_same_thread=check_same_thread,
+        )
+        # WAL lets the database be read while remote addons are synced
+        # in the background, and doesn't need a sync on every commit.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
     def closeDB(self):
         self.conn.commit()
         self.conn.close()
@@ -595,32 +1157,39 @@ class AddonManager:
                 self.installAddon(file)
 
     def installAddon(self, addon, interface_id=""):
+        """Returns True if addon was installed"""
+        with self.ignoreAddonFolderChanges():
+            return self.installAddonFile(addon, interface_id)
+
+    def installAddonFile(self, addon, interface_id):
         # Install .abc files
         if addon.endswith(".abc"):
-            self.installAbcFile(addon)
-            return
+            return self.installAbcFile(addon)
         elif addon.endswith(".rar"):
             self.addLog(
                 "OneLauncher does not support .rar archives, because it"
                 " is a proprietary format that would require and external "
                 "program to extract"
             )
-            return
+            return False
         elif addon.endswith(".zip"):
-            self.installZipAddon(addon, interface_id)
+            return self.installZipAddon(addon, interface_id)
+
+        return False
 
     def installAbcFile(self, addon):
         if self.currentGame.startswith("DDO"):
             self.addLog("DDO does not support .abc/music files")
-            return
+            return False
 
         copy(addon, self.data_folder_music)
         self.logger.info(addon + " installed")
         
         # Plain .abc files are installed to base music directory,
         # so what is scanned can't be controlled
-        self.winAddonManager.tableMusicInstalled.clearContents()
+        self.clearTable(self.winAddonManager.tableMusicInstalled)
         self.getInstalledMusic()
+        return True
 
     def installZipAddon(self, addon, interface_id):
         addon_type = ""
@@ -628,49 +1197,35 @@ class AddonManager:
             files_list = file.namelist()
             if not files_list:
                 self.addLog("Add-on Zip is empty. Aborting")
-                return
+                return False
 
             for entry in files_list:
                 if entry.endswith(".plugin"):
-                    self.installPluginZip(addon, interface_id, file, files_list, entry)
-                    return
-                elif entry.endswith(".abc"):
-                    if (
-                        self.installMusicZip(
-                            addon, interface_id, file, files_list, entry
-                        )
-                        == False
-                    ):
-                        continue
-                    else:
-                        return
-            self.installSkinZip(addon, interface_id, file, files_list, entry)
+                    return self.installPluginZip(
+                        addon, interface_id, file, files_list, entry
+                    )
+                # Some plugins have .abc files, but music collections
+                # shouldn't have .plugin files.
+                elif entry.endswith(".abc") and not self.checkForPluginFile(
+                    files_list
+                ):
+                    return self.installMusicZip(
+                        addon, interface_id, file, files_list, entry
+                    )
+            return self.installSkinZip(addon, interface_id, file, files_list, entry)
 
     def installPluginZip(self, addon, interface_id, file, files_list, entry):
         if self.currentGame.startswith("DDO"):
             self.addLog("DDO does not support plugins")
-            return
+            return False
 
         table = self.winAddonManager.tablePlugins
-        folder_original = entry.split("/")[0]
         path = self.data_folder_plugins
-        file.extractall(path=path)
+        installation_plan = self.getZipInstallationPlan(files_list)
+        self.extractZipAddon(file, installation_plan, path)
 
-        folder = self.moveAddonsFromInvalidFolder(
-            self.data_folder_plugins, folder_original
-        )
-        updated_files_list = []
-        for entry in files_list:
-            try:
-                updated_files_list.append(
-                    os.path.join(folder, entry.split(folder)[1].strip("/"))
-                )
-            except IndexError:
-                # Anything that was in an invalid folder
-                # should be ignored. This also fixes issues
-                # with entries for the invalid folders such
-                # as 'Plugins/'
-                continue
+        folder = installation_plan[entry].split("/")[0]
+        updated_files_list = list(installation_plan.values())
 
         plugins_list = [
             os.path.join(self.data_folder_plugins, entry)
@@ -688,7 +1243,9 @@ class AddonManager:
                 path,
                 table.objectName(),
             )
-            plugins_list_compendium = [compendium_file]
+            # There isn't one when the addon isn't in the catalog yet
+            if compendium_file:
+                plugins_list_compendium = [compendium_file]
 
         (plugins_list, plugins_list_compendium,) = self.removeManagedPluginsFromList(
             plugins_list, plugins_list_compendium
@@ -703,57 +1260,72 @@ class AddonManager:
             + str(plugins_list_compendium)
         )
 
-        self.installAddonRemoteDependencies(table.objectName() + "Installed")
+        self.installAddonRemoteDependencies(
+            table.objectName() + "Installed", interface_id
+        )
+        return True
 
     def installMusicZip(self, addon, interface_id, file, files_list, entry):
         if self.currentGame.startswith("DDO"):
             self.addLog("DDO does not support .abc/music files")
-            return
-
-        # Some plugins have .abc files, but music collections
-        # shouldn't have .plugin files.
-        if self.checkForPluginFile(files_list):
             return False
 
         table = self.winAddonManager.tableMusic
+        path = self.data_folder_music
 
-        path, folder = self.getAddonInstallationFolder(
-            entry, addon, files_list, self.data_folder_music
+        installation_plan = self.getZipInstallationPlan(
+            files_list, self.getAddonRootFolder(entry, addon, files_list)
         )
-        file.extractall(path=path)
+        self.extractZipAddon(file, installation_plan, path)
         self.logger.info(addon + " music installed")
 
-        folder = self.moveAddonsFromInvalidFolder(self.data_folder_music, folder)
-
-        if interface_id:
+        folders = self.getPlannedAddonFolders(installation_plan)
+        if interface_id and folders:
             compendium_file = self.generateCompendiumFile(
-                files_list, folder, interface_id, "Music", path, table.objectName(),
+                list(installation_plan.values()),
+                folders[0],
+                interface_id,
+                "Music",
+                path,
+                table.objectName(),
             )
-        self.getInstalledMusic(folders_list=[folder])
+        self.getInstalledMusic(folders_list=folders)
 
         self.handleStartupScriptActivationPrompt(table, interface_id)
 
-        self.installAddonRemoteDependencies(table.objectName() + "Installed")
+        self.installAddonRemoteDependencies(
+            table.objectName() + "Installed", interface_id
+        )
+        return True
 
     def installSkinZip(self, addon, interface_id, file, files_list, entry):
         table = self.winAddonManager.tableSkins
-        path, folder = self.getAddonInstallationFolder(
-            entry, addon, files_list, self.data_folder_skins
+        path = self.data_folder_skins
+
+        installation_plan = self.getZipInstallationPlan(
+            files_list, self.getAddonRootFolder(entry, addon, files_list)
         )
-        file.extractall(path=path)
+        self.extractZipAddon(file, installation_plan, path)
         self.logger.info(addon + " skin installed")
 
-        folder = self.moveAddonsFromInvalidFolder(self.data_folder_skins, folder)
-
-        if interface_id:
+        folders = self.getPlannedAddonFolders(installation_plan)
+        if interface_id and folders:
             compendium_file = self.generateCompendiumFile(
-                files_list, folder, interface_id, "Skin", path, table.objectName(),
+                list(installation_plan.values()),
+                folders[0],
+                interface_id,
+                "Skin",
+                path,
+                table.objectName(),
             )
-        self.getInstalledSkins(folders_list=[folder])
+        self.getInstalledSkins(folders_list=folders)
 
         self.handleStartupScriptActivationPrompt(table, interface_id)
 
-        self.installAddonRemoteDependencies(table.objectName() + "Installed")
+        self.installAddonRemoteDependencies(
+            table.objectName() + "Installed", interface_id
+        )
+        return True
 
     def checkForPluginFile(self, files_list):
         """Returns True if list of files contains a .plugin file"""
@@ -761,8 +1333,15 @@ class AddonManager:
             if entry.endswith(".plugin"):
                 return True
 
-    def installAddonRemoteDependencies(self, table):
-        """Installs the dependencies for the last installed addon"""
+    def installAddonRemoteDependencies(self, table, interface_id=""):
+        """
+        Installs the dependencies for the last installed addon. Addons
+        installed by an install batch are skipped, because the batch already
+        downloaded everything they depend on.
+        """
+        if interface_id in self.installing_IDs:
+            return
+
         # Gets dependencies for last column in db
         for item in self.c.execute(
             "SELECT Dependencies FROM {table} ORDER BY rowid DESC LIMIT 1".format(  # nosec
@@ -771,88 +1350,146 @@ class AddonManager:
         ):
             dependencies = item[0]
 
-        for dependency in dependencies.split(","):
-            if dependency:
-                # 0 is the arbitrary ID for Turbine Utilities. 1064 is the ID
-                # of OneLauncher's upload of the utilities on LotroInterface
-                if dependency == "0":
-                    dependency = "1064"
-
-                for item in self.c.execute(  # nosec
-                    "SELECT File, Name FROM {table} WHERE InterfaceID = ? AND InterfaceID NOT IN "
-                    "(SELECT InterfaceID FROM {table_installed})".format(
-                        table=table.split("Installed")[0], table_installed=table,
-                    ),
-                    (dependency,),
+        self.installRemoteAddonsWithDependencies(
+            self.getDependencyIDs(dependencies),
+            self.getTableFromObjectName(table.split("Installed")[0]),
+        )
+
+    def getDependencyIDs(self, dependencies):
+        """Returns InterfaceIDs in comma separated Dependencies value"""
+        # 0 is the arbitrary ID for Turbine Utilities. 1064 is the ID
+        # of OneLauncher's upload of the utilities on LotroInterface
+        return [
+            "1064" if dependency == "0" else dependency
+            for dependency in dependencies.split(",")
+            if dependency
+        ]
+
+    def getArchiveDependencies(self, path):
+        """Returns InterfaceIDs the compendium file in archive depends on"""
+        try:
+            with ZipFile(path, "r") as file:
+                for entry in file.namelist():
+                    if not entry.endswith("compendium"):
+                        continue
+
+                    doc = defusedxml.minidom.parseString(file.read(entry))
+                    for node in doc.getElementsByTagName("Dependencies"):
+                        return self.getDependencyIDs(getAddonDependencies(node))
+        except (OSError, BadZipFile, ExpatError):
+            self.logger.warning("Couldn't read dependencies of " + path, exc_info=True)
+
+        return []
+
+    def getAddonRootFolder(self, entry, addon, files_list):
+        """
+        Returns name of the folder to put archive entries in when the
+        archive doesn't have exactly one root folder. Returns an empty
+        string otherwise.
+        """
+        root_folders = {file.split("/")[0] for file in files_list}
+        if len(entry.split("/")) == 1 or len(root_folders) > 1:
+            return os.path.split(os.path.splitext(addon)[0])[1]
+
+        return ""
+
+    def getZipInstallationPlan(self, files_list, root_folder=""):
+        """
+        Returns dictionary with archive entries in files_list as keys and
+        the paths they are installed to as values. Paths are relative to
+        the data folder and use "/" like archive entries do. They start
+        with root_folder if given. Otherwise, leading folders like "ui" or
+        "Plugins" that wrap the addon are left out.
+        """
+        installation_plan = {}
+        for entry in files_list:
+            # Same as what ZipFile.extractall does to keep paths in the folder
+            parts = [
+                part
+                for part in entry.replace("\\", "/").split("/")
+                if part not in ("", ".", "..")
+            ]
+            if parts:
+                parts[0] = os.path.splitdrive(parts[0])[1]
+
+            if root_folder:
+                parts.insert(0, root_folder)
+            else:
+                # Files have to keep their name, but folders can be left out
+                min_parts = 0 if entry.endswith("/") else 1
+                while (
+                    len(parts) > min_parts and parts[0] in self.INVALID_FOLDER_NAMES
                 ):
-                    self.installRemoteAddon(item[0], item[1], dependency)
+                    del parts[0]
 
-    # Gets folder and makes one if there is no root folder
-    def getAddonInstallationFolder(self, entry, addon, files_list, data_folder):
-        # Gets list of base folders in archive
-        folders_list = []
-        for file in files_list:
-            folder = file.split(os.path.sep)[0]
-            if folder not in folders_list:
-                folders_list.append(folder)
-
-        # If no root folder or multiple root folders
-        if len(entry.split(os.path.sep)) == 1 or len(folders_list) > 1:
-            name = os.path.split(os.path.splitext(addon)[0])[1]
-            path = os.path.join(data_folder, name)
-            os.makedirs(os.path.split(path)[0], exist_ok=True)
-            folder = name
-        else:
-            path = data_folder
-            folder = entry.split("/")[0]
+            if parts and all(parts):
+                installation_plan[entry] = "/".join(parts)
 
-        return path, folder
+        return installation_plan
 
-    # Scans data folder for invalid folder names like "ui" or "plugins" and moves stuff out of them
-    def moveAddonsFromInvalidFolder(
-        self, data_folder, folder, folders_list=[], folders=""
-    ):
-        invalid_folder_names = [
-            "ui",
-            "skins",
-            "Plugins",
-            "Music",
-            "My Documents",
-            "Documents",
-            "The Lord of the Rings Online",
-            "Dungeons and Dragons Online",
-            "Dungeons & Dragons Online",
-        ]
+    def getPlannedAddonFolders(self, installation_plan):
+        """Returns names of the folders installation_plan puts files in"""
+        return list(
+            dict.fromkeys(
+                path.split("/")[0]
+                for path in installation_plan.values()
+                if "/" in path
+            )
+        )
 
-        if not folders_list:
-            folders_list = [folder]
+    def extractZipAddon(self, file, installation_plan, data_folder):
+        """
+        Extracts archive entries to their paths from installation_plan.
+        Entries are written once to a staging folder on the same file
+        system as data_folder and then renamed into data_folder, so
+        nothing has to be moved or copied after extracting.
+        """
+        staging_folder = os.path.join(self.data_folder, "Downloads")
+        os.makedirs(staging_folder, exist_ok=True)
+        staging_folder = mkdtemp(prefix="staging-", dir=staging_folder)
+        try:
+            for entry, path in installation_plan.items():
+                staged_path = os.path.join(staging_folder, *path.split("/"))
+                if entry.endswith("/"):
+                    os.makedirs(staged_path, exist_ok=True)
+                    continue
 
-        for folder in folders_list:
-            folder = folder.strip(os.path.sep)
-            folder = os.path.split(folder)[1]
-            if folder in invalid_folder_names:
-                folders = os.path.join(folders, folder)
-                folders_list = glob(os.path.join(data_folder, folders, "*", ""))
-                return self.moveAddonsFromInvalidFolder(
-                    data_folder, "", folders_list=folders_list, folders=folders
-                )
+                os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                with file.open(entry) as source, open(staged_path, "wb") as target:
+                    copyfileobj(source, target)
 
-        if folders:
-            # List of the folders that will be moved to the data folder
-            addon_folders_list = []
+            self.moveStagedFiles(staging_folder, data_folder)
+        finally:
+            rmtree(staging_folder, ignore_errors=True)
 
-            for file in os.listdir(os.path.join(data_folder, folders)):
-                if os.path.isdir(os.path.join(data_folder, folders, file)):
-                    addon_folders_list.append(file)
-                move(os.path.join(data_folder, folders, file), data_folder)
+    def moveStagedFiles(self, staging_folder, folder):
+        """
+        Renames everything in staging_folder into folder. Folders that
+        already exist are merged and files that already exist are replaced.
+        Files aren't replaced by folders or the other way around, since that
+        would delete what is already there, like another addon's folder.
+        """
+        os.makedirs(folder, exist_ok=True)
+        for name in os.listdir(staging_folder):
+            staged_path = os.path.join(staging_folder, name)
+            path = os.path.join(folder, name)
+
+            staged_is_folder = os.path.isdir(staged_path)
+            if staged_is_folder and os.path.isdir(path):
+                self.moveStagedFiles(staged_path, path)
+                continue
 
-            rmtree(os.path.join(data_folder, folders.split(os.path.sep)[0]))
+            if os.path.lexists(path) and (staged_is_folder or os.path.isdir(path)):
+                self.addLog(
+                    path
+                    + " wasn't installed, because it would replace a "
+                    + ("file" if staged_is_folder else "folder")
+                    + " that is already there"
+                )
+                continue
 
-            return addon_folders_list[0]
-        else:
-            return folder
+            os.replace(staged_path, path)
 
-    # Generates a compendium file for remote addon
     def generateCompendiumFile(
         self, files_list, folder, interface_id, addon_type, path, table
     ):
@@ -861,16 +1498,11 @@ class AddonManager:
         # Return if a compendium file already exists
         for file in files_list:
             if file.endswith(addon_type.lower() + "compendium"):
-                # Path includes folder when one has to be generated
-                tmp_folder = folder
-                if path.endswith(tmp_folder):
-                    tmp_folder = ""
-
                 compendium_file_path = os.path.join(
-                    path, tmp_folder, os.path.split(file)[1]
+                    path, folder, os.path.split(file)[1]
                 )
                 if os.path.exists(compendium_file_path):
-                    existing_compendium_values = self.parseCompendiumFile(
+                    existing_compendium_values = parseCompendiumFile(
                         compendium_file_path, addon_type + "Config"
                     )
                     dependencies = existing_compendium_values[7]
@@ -951,11 +1583,6 @@ class AddonManager:
                 mainNode.appendChild(startupScriptNode)
 
                 # Write compendium file
-
-                # Path includes folder when one has to be generated
-                if path.endswith(folder):
-                    folder = ""
-
                 compendium_file = os.path.join(
                     path, folder, row[0] + "." + addon_type.lower() + "compendium",
                 )
@@ -1008,35 +1635,107 @@ class AddonManager:
                 self.searchDB(self.winAddonManager.tableSkins, text)
 
     def searchDB(self, table, text):
-        table.clearContents()
-        table.setRowCount(0)
+        # Searches typed before this one are outdated now
+        self.addon_search.cancel()
+
+        terms = self.getSearchTerms(text)
+        rows = self.c.execute(
+            *self.getSearchStatement(table.objectName(), terms)
+        ).fetchall()
+
+        self.showSearchResults(table, rows, bool(terms))
+
+    def showSearchResults(self, table, rows, ranked):
+        if ranked:
+            # Search results are shown in order of relevance until the
+            # user sorts them.
+            table.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+        elif table.horizontalHeader().sortIndicatorSection() == -1:
+            table.horizontalHeader().setSortIndicator(1, QtCore.Qt.AscendingOrder)
+
+        table.model().setRows(rows)
+
+        # Sorts all rows instead of only the ones fetched so far
+        table.model().sort(
+            table.horizontalHeader().sortIndicatorSection(),
+            table.horizontalHeader().sortIndicatorOrder(),
+        )
 
-        if text:
-            for word in text.split():
-                search_word = "%" + word + "%"
+    def getSearchTerms(self, text):
+        """
+        Returns (columns, word) tuples for the words in text that have
+        something to search for. Words match the start of words in
+        SEARCH_COLUMNS, or in one column for words with a SEARCH_FILTERS prefix.
+        """
+        terms = []
+        for word in text.split():
+            columns = self.SEARCH_COLUMNS
+            prefix, separator, value = word.partition(":")
+            if separator and prefix.lower() in self.SEARCH_FILTERS:
+                columns = [self.SEARCH_FILTERS[prefix.lower()]]
+                word = value
+
+            # Words without letters or numbers don't have anything to match
+            if not any(character.isalnum() for character in word):
+                continue
 
-                for row in self.c.execute(
-                    "SELECT rowid, * FROM {table} WHERE Author LIKE ? OR Category"  # nosec
-                    " LIKE ? OR Name LIKE ?".format(table=table.objectName()),
-                    (search_word, search_word, search_word),
-                ):
-                    # Detects duplicates from multi-word search
-                    duplicate = False
-                    for item in table.findItems(row[1], QtCore.Qt.MatchExactly):
-                        if int((table.item(item.row(), 0)).text()) == row[0]:
-                            duplicate = True
-                            break
-                    if not duplicate:
-                        self.addRowToTable(table, row)
-        else:
+            terms.append((tuple(columns), word))
+
+        return terms
+
+    def getSearchStatement(self, table_name, terms, rowids=None):
+        """
+        Returns SQL and parameters for rows of table_name that match every
+        term. Results can be limited to a list of rowids.
+        """
+        # Rows end with the Installed and Outdated status of the addon.
+        # Rows of installed tables are never shown as installed.
+        table_remote = table_name.split("Installed")[0]
+        select = (
+            "SELECT {table}.rowid, {table}.*, {installed}, IFNULL(catalog.Outdated, 0)"
+            " FROM {table} LEFT JOIN tableCatalogAddons AS catalog ON"
+            " catalog.TableName = ? AND catalog.InterfaceID = {table}.InterfaceID"
+        ).format(
+            table=table_name,
+            installed="0"
+            if table_remote != table_name
+            else "IFNULL(catalog.Installed, 0)",
+        )
+
+        if not terms:
             # Shows all plugins if the search bar is empty
-            for row in self.c.execute(
-                "SELECT rowid, * FROM {table}".format(table=table.objectName())  # nosec
-            ):
-                self.addRowToTable(table, row)
+            return (select, (table_remote,))
+
+        # Words are quoted, so FTS5 syntax in them is searched for literally
+        query = " AND ".join(
+            '{%s} : "%s"*' % (" ".join(columns), word.replace('"', '""'))
+            for columns, word in terms
+        )
+
+        rowids_filter = ""
+        if rowids is not None:
+            rowids_filter = " AND {table}.rowid IN ({})".format(
+                ",".join("?" * len(rowids)), table=table_name
+            )
+
+        # Best matches first
+        return (
+            "{select} WHERE {table} MATCH ?{rowids_filter}"  # nosec
+            " ORDER BY bm25({table})".format(
+                select=select, table=table_name, rowids_filter=rowids_filter
+            ),
+            [table_remote, query] + list(rowids or []),
+        )
 
     def isTableEmpty(self, table):
-        return not table.item(0, 1)
+        return not table.model().rows
+
+    def clearTable(self, table):
+        table.model().setRows([])
+
+    def getTableRowData(self, table, row, column, role=QtCore.Qt.DisplayRole):
+        """Returns data for row and column of table as it is sorted in the UI"""
+        return table.model().index(row, column).data(role)
 
     def reloadSearch(self, table):
         """Re-searches the current search"""
@@ -1052,80 +1751,92 @@ class AddonManager:
                 self.searchDB(table, "")
 
     def setRemoteAddonToUninstalled(self, addon, remote_table):
+        # Also removes indicator that a new version of the addon is out if
+        # present. This is important, because addons are uninstalled and then
+        # reinstalled during the update process.
         self.c.execute(
-            "UPDATE {table} SET Name = ? WHERE InterfaceID == ?".format(  # nosec
-                table=remote_table.objectName()
-            ),
-            (addon[2], addon[0],),
+            "UPDATE tableCatalogAddons SET Installed = 0, Outdated = 0 WHERE"
+            " TableName = ? AND InterfaceID = ?",
+            (remote_table.objectName(), addon[0]),
         )
 
-        # Removes indicator that a new version of an installed addon is out if present.
-        # This is important, because addons are uninstalled and then reinstalled
-        # during the update process.
+    def setRemoteAddonToInstalled(self, addon, remote_table):
         self.c.execute(
-            "UPDATE {table} SET Version = REPLACE(Version,'(Updated) ', '') WHERE "  # nosec
-            "Version LIKE '(Updated) %'".format(table=remote_table.objectName())
+            "UPDATE tableCatalogAddons SET Installed = 1 WHERE TableName = ? AND"
+            " InterfaceID = ?",
+            (remote_table.objectName(), addon[0]),
         )
 
-    def setRemoteAddonToInstalled(self, addon, remote_table):
-        self.c.execute(
-            "UPDATE {table} SET Name = ? WHERE InterfaceID == ?".format(  # nosec
-                table=remote_table.objectName()
+    def addRowsToDB(self, table, rows):
+        """
+        Adds rows to database table with one statement. Callers group
+        this with their other writes in a transaction.
+        """
+        self.c.executemany(
+            "INSERT INTO {table} VALUES({})".format(  # nosec
+                self.ROW_PLACEHOLDERS, table=table.objectName()
             ),
-            ("(Installed) " + addon[2], addon[0],),
+            rows,
         )
 
-    # Adds row to a visible table. First value in list is row name
-    def addRowToTable(self, table, list):
-        table.setSortingEnabled(False)
-
-        disable_row = False
-
-        rows = table.rowCount()
-        table.setRowCount(rows + 1)
-
-        # Sets row name
-        tbl_item = QtWidgets.QTableWidgetItem()
-        tbl_item.setText(str(list[0]))
-
-        # Adds items to row
-        for column, item in enumerate(list):
-            tbl_item = QtWidgets.QTableWidgetItem()
+    def addInstalledAddonRowsToDB(self, table, rows):
+        """
+        Adds rows to installed addons table along with their dependencies
+        to tableAddonDependencies. Callers group this with their other
+        writes in a transaction.
+        """
+        # New rows get rowids after the current last one
+        first_rowid = 1
+        for entry in self.c.execute(
+            "SELECT rowid + 1 FROM {table} ORDER BY rowid DESC LIMIT 1".format(  # nosec
+                table=table.objectName()
+            )
+        ):
+            first_rowid = entry[0]
+
+        self.addRowsToDB(table, rows)
+
+        new_rows = self.c.execute(
+            "SELECT rowid, InterfaceID, Dependencies FROM {table} WHERE rowid >= ?"  # nosec
+            " AND Dependencies != ''".format(table=table.objectName()),
+            (first_rowid,),
+        ).fetchall()
+        self.c.executemany(
+            "INSERT OR IGNORE INTO tableAddonDependencies VALUES(?, ?, ?, ?)",
+            [
+                (table.objectName(), rowid, interface_id, dependency)
+                for rowid, interface_id, dependencies in new_rows
+                for dependency in self.getDependencyIDs(dependencies)
+            ],
+        )
 
-            tbl_item.setText(str(item))
-            # Sets color to red if addon is unmanaged
-            if item == "Unmanaged" and column == 2:
-                tbl_item.setForeground(QtGui.QColor("darkred"))
-            # Disable row if addon is Installed. This is only applicable to remote tables.
-            elif str(item).startswith("(Installed) ") and column == 1:
-                tbl_item.setText(item.split("(Installed) ")[1])
-                disable_row = True
-            elif str(item).startswith("(Updated) ") and column == 3:
-                tbl_item.setText(item.split("(Updated) ")[1])
-                tbl_item.setForeground(QtGui.QColor("green"))
-            elif str(item).startswith("(Outdated) ") and column == 3:
-                tbl_item.setText(item.split("(Outdated) ")[1])
-                tbl_item.setForeground(QtGui.QColor("crimson"))
-
-            table.setItem(rows, column, tbl_item)
-
-        if disable_row:
-            for i in range(table.columnCount()):
-                table.item(rows, i).setFlags(QtCore.Qt.ItemIsEnabled)
-                table.item(rows, i).setBackground(self.installed_addons_color)
-
-        table.setSortingEnabled(True)
-
-    def addRowToDB(self, table, list):
-        question_marks = "?"
-        for _ in range(len(list) - 1):
-            question_marks += ",?"
+    def deleteInstalledAddonRows(self, table, condition=None, parameters=()):
+        """
+        Deletes rows of installed addons table that match SQL condition,
+        or all of them, along with their dependencies
+        """
+        if not condition:
+            self.c.execute(
+                "DELETE FROM tableAddonDependencies WHERE TableName = ?",
+                (table.objectName(),),
+            )
+            self.c.execute(
+                "DELETE FROM {table}".format(table=table.objectName())  # nosec
+            )
+            return
 
         self.c.execute(
-            "INSERT INTO {table} VALUES({})".format(
-                question_marks, table=table.objectName()
+            "DELETE FROM tableAddonDependencies WHERE TableName = ? AND AddonRowid"  # nosec
+            " IN (SELECT rowid FROM {table} WHERE {condition})".format(
+                table=table.objectName(), condition=condition
+            ),
+            (table.objectName(),) + tuple(parameters),
+        )
+        self.c.execute(
+            "DELETE FROM {table} WHERE {condition}".format(  # nosec
+                table=table.objectName(), condition=condition
             ),
-            (list),  # nosec
+            parameters,
         )
 
     def btnBoxActivated(self):
@@ -1149,11 +1860,9 @@ class AddonManager:
 
         # If on installed tab which means remove addons
         if table.objectName().endswith("Installed"):
-            uninstall_function = self.getUninstallFunctionFromTable(table)
-
             uninstallConfirm, addons = self.getUninstallConfirm(table)
             if uninstallConfirm:
-                uninstall_function(addons, table)
+                self.uninstallAddonsAndOrphans(addons, table)
                 self.resetRemoteAddonsTables()
 
         elif self.winAddonManager.tabWidget.currentIndex() == 1:
@@ -1179,9 +1888,9 @@ class AddonManager:
 
         addons, details = self.getSelectedAddons(table)
         if addons and details:
-            for addon in addons:
-                self.installRemoteAddon(addon[1], addon[2], addon[0])
-                self.setRemoteAddonToInstalled(addon, table)
+            self.installRemoteAddonsWithDependencies(
+                [addon[0] for addon in addons], table
+            )
 
             self.resetRemoteAddonsTables()
             self.searchSearchBarContents()
@@ -1220,13 +1929,353 @@ class AddonManager:
 
         return table
 
-    def installRemoteAddon(self, url, name, interface_id):
-        path = os.path.join(self.data_folder, "Downloads", name + ".zip")
-        os.makedirs(os.path.split(path)[0], exist_ok=True)
-        status = self.downloader(url, path)
-        if status:
-            self.installAddon(path, interface_id=interface_id)
+    def installRemoteAddonsWithDependencies(self, interface_ids, table):
+        """
+        Installs addons from remote table along with everything they depend
+        on that isn't installed. Dependencies are read from the catalog and
+        from the compendium files in the downloaded archives. Each time
+        downloads finish, the new dependencies they list are downloaded
+        together. Once everything is downloaded, addons are installed with
+        their dependencies first.
+        """
+        batch = {
+            "table": table,
+            # InterfaceID is the key and a set of the InterfaceIDs it
+            # depends on is the value
+            "dependencies": {},
+            "downloads": {},
+            "pending": set(),
+            "failed": set(),
+            # Addons of the batch being installed are installed right after
+            # the ones that depend on them when there is a dependency cycle
+            "installed": self.installing_IDs
+            | {
+                entry[0]
+                for entry in self.c.execute(
+                    "SELECT InterfaceID FROM {table} WHERE InterfaceID != ''".format(  # nosec
+                        table=table.objectName() + "Installed"
+                    )
+                )
+            },
+        }
+        batch_id = uuid.uuid4().hex
+        self.install_batches[batch_id] = batch
+
+        self.addAddonsToInstallBatch(batch_id, interface_ids)
+        self.completeInstallBatchDownload(batch_id)
+
+    def addAddonsToInstallBatch(self, batch_id, interface_ids):
+        """
+        Queues downloads of interface_ids that aren't in the batch yet along
+        with everything they depend on according to the catalog
+        """
+        batch = self.install_batches[batch_id]
+        table = batch["table"]
+
+        new_IDs = [
+            interface_id
+            for interface_id in dict.fromkeys(interface_ids)
+            if interface_id not in batch["dependencies"]
+            and interface_id not in batch["installed"]
+        ]
+        if not new_IDs:
+            return
+
+        addons = self.c.execute(
+            "SELECT catalog.InterfaceID, remote.File, remote.Name, catalog.UIVersion,"  # nosec
+            " remote.Dependencies FROM tableCatalogAddons AS catalog JOIN {table} AS"
+            " remote ON remote.rowid = catalog.FTSRowid WHERE catalog.TableName = ?"
+            " AND catalog.InterfaceID IN ({})".format(
+                ",".join("?" * len(new_IDs)), table=table.objectName()
+            ),
+            [table.objectName()] + new_IDs,
+        ).fetchall()
+
+        found_IDs = {addon[0] for addon in addons}
+        missing_IDs = [
+            interface_id for interface_id in new_IDs if interface_id not in found_IDs
+        ]
+        if missing_IDs:
+            self.addLog(
+                "Dependencies with the IDs "
+                + ", ".join(missing_IDs)
+                + " couldn't be found and won't be installed"
+            )
+            # Addons that need them are still installed
+            for interface_id in missing_IDs:
+                batch["dependencies"][interface_id] = set()
+
+        # Every addon is in pending before any download can finish the batch
+        for addon in addons:
+            batch["dependencies"][addon[0]] = set(self.getDependencyIDs(addon[4]))
+            batch["pending"].add(addon[0])
+
+        # What the catalog says they depend on is added before anything is
+        # downloaded, so the whole batch is downloaded at the same time
+        self.addAddonsToInstallBatch(
+            batch_id,
+            [
+                dependency
+                for addon in addons
+                for dependency in batch["dependencies"][addon[0]]
+            ],
+        )
+
+        for interface_id, url, name, version, _ in addons:
+            path = os.path.join(self.data_folder, "Downloads", name + ".zip")
+            os.makedirs(os.path.split(path)[0], exist_ok=True)
+            # The archive is replaced by this download
+            self.resumed_downloads = [
+                download
+                for download in self.resumed_downloads
+                if download["path"] != path
+            ]
+
+            download = {
+                "interface_id": interface_id,
+                "table": table.objectName(),
+                "version": version,
+                "data_folder": self.data_folder,
+                "batch": batch_id,
+            }
+            if self.getCachedArchive(download, path):
+                self.logger.info("Using " + name + " from archive cache")
+                self.addonDownloadDone(dict(download, url=url, path=path), True)
+            elif not self.download_manager.add(url, path, **download):
+                self.attachQueuedDownload(batch_id, interface_id, path)
+
+    def attachQueuedDownload(self, batch_id, interface_id, path):
+        """
+        Makes the download that is already queued to path part of batch.
+        The batch it belongs to is merged into this one, so everything is
+        still installed in dependency order.
+        """
+        batch = self.install_batches[batch_id]
+        queued_download = self.download_manager.getQueuedDownload(path)
+        if not queued_download or queued_download["interface_id"] != interface_id:
+            # A different addon with the same name is being downloaded
+            self.addLog(
+                os.path.splitext(os.path.basename(path))[0]
+                + " wasn't installed, because another addon with the same name"
+                " is being downloaded"
+            )
+            batch["pending"].discard(interface_id)
+            batch["failed"].add(interface_id)
+            return
+
+        queued_batch_id = self.getDownloadBatchID(queued_download)
+        queued_batch = self.install_batches.get(queued_batch_id)
+        if queued_batch_id == batch_id:
+            return
+        elif queued_batch is None:
+            # Downloads from earlier sessions aren't part of a batch
+            self.download_batch_IDs[path] = batch_id
+        elif queued_batch["table"] is batch["table"]:
+            self.mergeInstallBatches(batch_id, queued_batch_id)
+        else:
+            # Addons of different tables are installed separately
+            batch["pending"].discard(interface_id)
+
+    def mergeInstallBatches(self, batch_id, other_batch_id):
+        """Moves everything from the other batch into batch"""
+        batch = self.install_batches[batch_id]
+        other_batch = self.install_batches.pop(other_batch_id)
+
+        for interface_id, dependencies in other_batch["dependencies"].items():
+            batch["dependencies"].setdefault(interface_id, set()).update(
+                dependencies
+            )
+        batch["downloads"].update(other_batch["downloads"])
+        for key in ("pending", "failed", "installed"):
+            batch[key] |= other_batch[key]
+
+        self.merged_batch_IDs[other_batch_id] = batch_id
+
+    def getDownloadBatchID(self, download):
+        """Returns ID of the batch download is part of"""
+        batch_id = self.download_batch_IDs.get(download["path"], download.get("batch"))
+        while batch_id in self.merged_batch_IDs:
+            batch_id = self.merged_batch_IDs[batch_id]
+
+        return batch_id
+
+    def addonDownloadDone(self, download, succeeded):
+        """
+        Adds download to its install batch. Downloads resumed from earlier
+        sessions aren't part of one, so they are kept for
+        installResumedDownloads().
+        """
+        batch_id = self.getDownloadBatchID(download)
+        self.download_batch_IDs.pop(download["path"], None)
+        batch = self.install_batches.get(batch_id)
+        if not batch or download["interface_id"] not in batch["pending"]:
+            if succeeded:
+                self.resumed_downloads.append(download)
+            return
+
+        interface_id = download["interface_id"]
+        if succeeded:
+            batch["downloads"][interface_id] = download
+            batch["dependencies"][interface_id].update(
+                self.getArchiveDependencies(download["path"])
+            )
+            self.addAddonsToInstallBatch(
+                batch_id, batch["dependencies"][interface_id]
+            )
+        else:
+            batch["failed"].add(interface_id)
+
+        batch["pending"].discard(interface_id)
+        self.completeInstallBatchDownload(batch_id)
+
+    def completeInstallBatchDownload(self, batch_id):
+        """Installs batch once none of its downloads are pending"""
+        batch = self.install_batches.get(batch_id)
+        if not batch or batch["pending"]:
+            return
+        del self.install_batches[batch_id]
+        self.merged_batch_IDs = {
+            merged_batch_id: into_batch_id
+            for merged_batch_id, into_batch_id in self.merged_batch_IDs.items()
+            if into_batch_id != batch_id
+        }
+
+        # Only dependencies that are part of the batch are ordered
+        graph = {
+            interface_id: dependencies & batch["dependencies"].keys()
+            for interface_id, dependencies in batch["dependencies"].items()
+        }
+        order, cyclic_IDs = getDependencyOrder(graph)
+        if cyclic_IDs:
+            self.addLog(
+                "Addons with the IDs "
+                + ", ".join(cyclic_IDs)
+                + " are part of or depend on a dependency cycle"
+            )
+            # Dependencies are found after the addons that need them
+            order += reversed(cyclic_IDs)
+
+        self.installing_IDs = set(batch["downloads"])
+        not_installed = set(batch["failed"])
+        try:
+            for interface_id in order:
+                download = batch["downloads"].get(interface_id)
+                if not download:
+                    continue
+
+                if graph[interface_id] & not_installed:
+                    not_installed.add(interface_id)
+                    os.remove(download["path"])
+                    self.addLog(
+                        os.path.splitext(os.path.basename(download["path"]))[0]
+                        + " wasn't installed, because some of its dependencies"
+                        " couldn't be downloaded"
+                    )
+                    continue
+
+                if not self.installDownloadedAddon(download):
+                    not_installed.add(interface_id)
+        finally:
+            self.installing_IDs = set()
+
+    def getArchiveCacheKey(self, download):
+        return "%s-%s" % (download["interface_id"], download["version"])
+
+    def getCachedArchive(self, download, path):
+        """
+        Copies the cached archive for download to path. Corrupt archives are
+        removed from the cache. Returns False if there isn't a valid one.
+        """
+        cache_key = self.getArchiveCacheKey(download)
+        if not self.archive_cache.get(cache_key, path):
+            return False
+
+        if is_zipfile(path):
+            return True
+
+        self.archive_cache.remove(cache_key)
+        os.remove(path)
+        return False
+
+    def downloadFinished(self, download):
+        path = download["path"]
+        if not is_zipfile(path):
+            # Error pages and truncated bodies shouldn't be installed or cached
+            self.addLog(os.path.basename(path) + " is not a valid archive")
             os.remove(path)
+            self.addonDownloadDone(download, False)
+            return
+
+        if download.get("version") is not None:
+            self.archive_cache.put(self.getArchiveCacheKey(download), path)
+
+        self.addonDownloadDone(download, True)
+
+    def installDownloadedAddon(self, download):
+        """Returns True if download was installed"""
+        path = download["path"]
+        try:
+            installed = self.installAddon(path, interface_id=download["interface_id"])
+        except BadZipFile:
+            self.addLog(os.path.basename(path) + " is not a valid archive")
+            if download.get("version") is not None:
+                self.archive_cache.remove(self.getArchiveCacheKey(download))
+            return False
+        except Exception:
+            self.addLog(os.path.basename(path) + " couldn't be installed")
+            self.logger.error("Installing " + path + " failed", exc_info=True)
+            return False
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+        if installed:
+            self.setRemoteAddonToInstalled(
+                [download["interface_id"]],
+                self.getTableFromObjectName(download["table"]),
+            )
+        return bool(installed)
+
+    def downloadFailed(self, download):
+        self.addLog(
+            "Downloading "
+            + os.path.basename(download["path"])
+            + " failed. You may want to check your connection."
+        )
+        self.addonDownloadDone(download, False)
+
+    def downloadsFinished(self):
+        self.installResumedDownloads()
+        self.resetRemoteAddonsTables()
+        self.searchSearchBarContents()
+
+    def installResumedDownloads(self):
+        """Asks before installing the downloads that were resumed from last time"""
+        downloads, self.resumed_downloads = self.resumed_downloads, []
+        if not downloads:
+            return
+
+        names = [
+            os.path.splitext(os.path.basename(download["path"]))[0]
+            for download in downloads
+        ]
+        if len(downloads) == 1:
+            text = "An addon download from last time finished. Install it?"
+        else:
+            text = "%d addon downloads from last time finished. Install them?" % len(
+                downloads
+            )
+        if self.confirmationPrompt(text, "\n".join(names)):
+            for download in downloads:
+                self.installDownloadedAddon(download)
+        else:
+            for download in downloads:
+                os.remove(download["path"])
+
+    def getTableFromObjectName(self, table_name):
+        # UI table object names are renamed with DDO in them when the current game is
+        # DDO for DB access, but the callable name for the UI tables stays the same.
+        return getattr(self.winAddonManager, table_name.replace("DDO", ""))
 
     def getUninstallConfirm(self, table):
         addons, details = self.getSelectedAddons(table)
@@ -1247,16 +2296,18 @@ class AddonManager:
             return False, addons
 
     def getSelectedAddons(self, table):
-        if not table.selectedItems():
+        selected_rows = sorted(
+            {index.row() for index in table.selectionModel().selectedIndexes()}
+        )
+        if not selected_rows:
             return None, None
         selected_addons = []
         details = ""
-        # Column count is minus one because of hidden ID column
-        for item in table.selectedItems()[0 :: (table.columnCount() - 1)]:
+        for row in selected_rows:
             # Gets db row id for selected row
-            selected_row = int((table.item(item.row(), 0)).text())
+            selected_row = self.getTableRowData(table, row, 0)
 
-            selected_name = table.item(item.row(), 1).text()
+            selected_name = self.getTableRowData(table, row, 1)
 
             for selected_addon in self.c.execute(
                 "SELECT InterfaceID, File, Name FROM {table} WHERE rowid = ?".format(  # nosec
@@ -1269,33 +2320,82 @@ class AddonManager:
 
         return selected_addons, details
 
+    def uninstallAddonsAndOrphans(self, addons, table):
+        """
+        Uninstalls addons from installed table. Then asks to also uninstall
+        the addons they depended on that nothing else depends on anymore.
+        """
+        dependencies = self.getAddonsDependencies(addons, table)
+
+        with self.ignoreAddonFolderChanges():
+            self.getUninstallFunctionFromTable(table)(addons, table)
+
+        orphans = self.getOrphanedDependencies(dependencies, table)
+        if orphans and self.confirmationPrompt(
+            str(len(orphans))
+            + (" addon was" if len(orphans) == 1 else " addons were")
+            + " only needed by the uninstalled addons. Do you want to uninstall"
+            + (" it" if len(orphans) == 1 else " them")
+            + " as well?",
+            "".join(orphan[2] + "\n" for orphan in orphans),
+        ):
+            self.uninstallAddonsAndOrphans(orphans, table)
+
+    def getAddonsDependencies(self, addons, table):
+        """Returns InterfaceIDs that addons in installed table depend on"""
+        interface_IDs = [addon[0] for addon in addons if addon[0]]
+        return [
+            entry[0]
+            for entry in self.c.execute(
+                "SELECT DISTINCT Dependency FROM tableAddonDependencies WHERE"
+                " TableName = ? AND InterfaceID IN ({})".format(  # nosec
+                    ",".join("?" * len(interface_IDs))
+                ),
+                [table.objectName()] + interface_IDs,
+            )
+        ]
+
+    def getOrphanedDependencies(self, dependencies, table):
+        """
+        Returns (InterfaceID, File, Name) of the addons in dependencies
+        that are installed and that no installed addon depends on
+        """
+        needed_IDs = {
+            entry[0]
+            for entry in self.c.execute(
+                "SELECT DISTINCT Dependency FROM tableAddonDependencies WHERE"
+                " TableName = ? AND Dependency IN ({})".format(  # nosec
+                    ",".join("?" * len(dependencies))
+                ),
+                [table.objectName()] + dependencies,
+            )
+        }
+        orphan_IDs = [
+            dependency for dependency in dependencies if dependency not in needed_IDs
+        ]
+        if not orphan_IDs:
+            return []
+
+        return self.c.execute(
+            "SELECT InterfaceID, File, Name FROM {table} WHERE InterfaceID IN ({})".format(  # nosec
+                ",".join("?" * len(orphan_IDs)), table=table.objectName()
+            ),
+            orphan_IDs,
+        ).fetchall()
+
     def uninstallPlugins(self, plugins, table):
-        for plugin in plugins:
+        plugins = [self.getManagedPluginAddon(plugin) for plugin in plugins]
+        for plugin in self.checkAddonsForDependencies(plugins, table):
             if plugin[1].endswith(".plugin"):
                 plugin_files = [plugin[1]]
             else:
-                plugin_files = []
-                if self.checkAddonForDependencies(plugin, table):
-                    doc = defusedxml.minidom.parse(plugin[1])
-                    nodes = doc.getElementsByTagName("Descriptors")[0].childNodes
-                    for node in nodes:
-                        if node.nodeName == "descriptor":
-                            plugin_files.append(
-                                os.path.join(
-                                    self.data_folder_plugins,
-                                    (GetText(node.childNodes).replace("\\", os.sep)),
-                                )
-                            )
-                    # Check for startup scripts to remove them
-                    nodes = doc.getElementsByTagName("PluginConfig")[0].childNodes
-                    for node in nodes:
-                        if node.nodeName == "StartupScript":
-                            script = GetText(node.childNodes)
-                            self.uninstallStartupScript(
-                                script, self.data_folder_plugins
-                            )
-                else:
-                    continue
+                plugin_files = self.getCompendiumPluginFiles(plugin[1])
+
+                # Check for startup scripts to remove them
+                script = self.getAddonFilesMetadata([(plugin[1], "PluginConfig")])[
+                    plugin[1]
+                ]["row"][8]
+                self.uninstallStartupScript(script, self.data_folder_plugins)
 
             for plugin_file in plugin_files:
                 if os.path.exists(plugin_file):
@@ -1324,7 +2424,7 @@ class AddonManager:
             self.setRemoteAddonToUninstalled(plugin, self.winAddonManager.tablePlugins)
 
         # Reloads plugins
-        table.clearContents()
+        self.clearTable(table)
         self.getInstalledPlugins()
 
     def uninstallSkins(self, skins, table):
@@ -1332,7 +2432,7 @@ class AddonManager:
             if skin[1].endswith(".skincompendium"):
                 skin_path = os.path.split(skin[1])[0]
 
-                items_row = self.parseCompendiumFile(skin[1], "SkinConfig")
+                items_row = parseCompendiumFile(skin[1], "SkinConfig")
                 script = items_row[8]
                 self.uninstallStartupScript(script, self.data_folder_skins)
             else:
@@ -1344,7 +2444,7 @@ class AddonManager:
             self.setRemoteAddonToUninstalled(skin, self.winAddonManager.tableSkins)
 
         # Reloads skins
-        table.clearContents()
+        self.clearTable(table)
         self.getInstalledSkins()
 
     def uninstallMusic(self, music_list, table):
@@ -1352,7 +2452,7 @@ class AddonManager:
             if music[1].endswith(".musiccompendium"):
                 music_path = os.path.split(music[1])[0]
 
-                items_row = self.parseCompendiumFile(music[1], "MusicConfig")
+                items_row = parseCompendiumFile(music[1], "MusicConfig")
                 script = items_row[8]
                 self.uninstallStartupScript(script, self.data_folder_music)
             else:
@@ -1368,36 +2468,51 @@ class AddonManager:
             self.setRemoteAddonToUninstalled(music, self.winAddonManager.tableMusic)
 
         # Reloads music
-        table.clearContents()
+        self.clearTable(table)
         self.getInstalledMusic()
 
-    def checkAddonForDependencies(self, addon, table):
-        # Turbine Utilities is treated as having ID 0
-        addon_ID = "0" if addon[0] == "1064" else addon[0]
-        details = ""
+    def checkAddonsForDependencies(self, addons, table):
+        """
+        Returns the addons that the user still wants to remove after being
+        told about the other installed addons that depend on them. Addons
+        that are removed together don't count as depending on each other.
+        """
+        interface_IDs = [addon[0] for addon in addons if addon[0]]
+
+        # Dependency is the key and list of dependent names is the value
+        dependents = {}
+        for dependency, name in self.c.execute(
+            "SELECT dependencies.Dependency, installed.Name FROM"  # nosec
+            " tableAddonDependencies AS dependencies JOIN {table} AS installed ON"
+            " installed.rowid = dependencies.AddonRowid WHERE"
+            " dependencies.TableName = ? AND dependencies.Dependency IN ({ids}) AND"
+            " dependencies.InterfaceID NOT IN ({ids})".format(
+                ids=",".join("?" * len(interface_IDs)), table=table.objectName()
+            ),
+            [table.objectName()] + interface_IDs * 2,
+        ).fetchall():
+            dependents.setdefault(dependency, []).append(name)
+
+        confirmed_addons = []
+        for addon in addons:
+            names = dependents.get(addon[0])
+            if names:
+                plural = " addon depends" if len(names) == 1 else " addons depend"
+                text = (
+                    str(len(names))
+                    + plural
+                    + " on "
+                    + addon[2]
+                    + ". Are you sure you want to remove it?"
+                )
+                if not self.confirmationPrompt(
+                    text, "".join(name + "\n" for name in names)
+                ):
+                    continue
 
-        for dependent in self.c.execute(
-            'SELECT Name, Dependencies FROM {table} WHERE Dependencies != ""'.format(  # nosec
-                table=table.objectName()
-            )
-        ):
-            for dependency in dependent[1].split(","):
-                if dependency == addon_ID:
-                    details = details + dependent[0] + "\n"
+            confirmed_addons.append(addon)
 
-        if details:
-            num_depends = len(details.split("\n")) - 1
-            plural = " addon depends" if num_depends == 1 else " addons deppend"
-            text = (
-                str(num_depends)
-                + plural
-                + " on "
-                + addon[2]
-                + ". Are you sure you want to remove it?"
-            )
-            return self.confirmationPrompt(text, details)
-        else:
-            return True
+        return confirmed_addons
 
     def confirmationPrompt(self, text, details):
         messageBox = QtWidgets.QMessageBox(self.parent)
@@ -1467,103 +2582,273 @@ class AddonManager:
 
     def loadRemoteAddons(self):
         if self.currentGame.startswith("LOTRO"):
-            # Only keep loading remote add-ons if the first load doesn't run into issues
-            if self.getRemoteAddons(
-                self.PLUGINS_URL, self.winAddonManager.tablePlugins
-            ):
-                self.getRemoteAddons(self.SKINS_URL, self.winAddonManager.tableSkins)
-                self.getRemoteAddons(self.MUSIC_URL, self.winAddonManager.tableMusic)
-                return True
+            return self.getRemoteAddons(
+                [
+                    (self.PLUGINS_URL, self.winAddonManager.tablePlugins),
+                    (self.SKINS_URL, self.winAddonManager.tableSkins),
+                    (self.MUSIC_URL, self.winAddonManager.tableMusic),
+                ]
+            )
         else:
-            if self.getRemoteAddons(
-                self.SKINS_DDO_URL, self.winAddonManager.tableSkins
-            ):
-                return True
+            return self.getRemoteAddons(
+                [(self.SKINS_DDO_URL, self.winAddonManager.tableSkins)]
+            )
 
-    def getRemoteAddons(self, favorites_url, table):
-        # Clears rows from db table
-        self.c.execute("DELETE FROM {table}".format(table=table.objectName()))  # nosec
+    def getRemoteAddons(self, feeds):
+        """
+        Syncs remote addons tables with their lotrointerface favorites feeds.
+        feeds is a list of (favorites url, table) tuples. All feeds are synced
+        at the same time, and each table is populated as soon as its own feed
+        is done. Returns True if at least one feed was synced.
+        """
+        # Feeds are synced with their own database connections,
+        # so they have to see everything done on this one
+        self.conn.commit()
 
-        # Gets list of Interface IDs for installed addons
-        installed_IDs = []
-        for ID in self.c.execute(
-            "SELECT InterfaceID FROM {table}".format(  # nosec
-                table=table.objectName() + "Installed"
-            )
-        ):
-            if ID[0]:
-                installed_IDs.append(ID[0])
+        loaded_any = False
+        failed_any = False
+        loop = QtCore.QEventLoop()
 
-        try:
-            addons_file = urllib.request.urlopen(favorites_url).read().decode()  # nosec
-        except (urllib.error.URLError, urllib.error.HTTPError) as error:
-            self.logger.error(error.reason, exc_info=True)
+        def feedSynced(future):
+            nonlocal loaded_any, failed_any
+            favorites_url, table = pending.pop(future)
+            try:
+                future.result()
+            except (OSError, ParseError, ValueError, sqlite3.Error):
+                self.logger.error(
+                    "Failed to sync remote addons from " + favorites_url,
+                    exc_info=True,
+                )
+                failed_any = True
+            else:
+                self.resetRemoteAddonsStatus(table)
+                self.conn.commit()
+
+                # Populate user visible table. This should not reload
+                # the current search.
+                self.searchDB(table, "")
+                loaded_any = True
+
+            if not pending:
+                loop.quit()
+
+        watcher = FutureWatcher(feedSynced)
+        with ThreadPoolExecutor(max_workers=len(feeds)) as executor:
+            pending = {
+                executor.submit(
+                    self.syncRemoteAddonsFeed, favorites_url, table.objectName()
+                ): (favorites_url, table)
+                for favorites_url, table in feeds
+            }
+            for future in list(pending):
+                watcher.watch(future)
+
+            # Keeps window drawn without letting the user start anything else.
+            # Feeds that are already done were handled by watch().
+            if pending:
+                loop.exec_(QtCore.QEventLoop.ExcludeUserInputEvents)
+
+        if failed_any:
             self.addLog(
                 "There was a network error. You may want to check your connection."
             )
+        if not loaded_any:
             self.winAddonManager.tabWidget.setCurrentIndex(0)
-            return False
 
-        doc = defusedxml.minidom.parseString(addons_file)
-        tags = doc.getElementsByTagName("Ui")
-        for tag in tags:
+        return loaded_any
+
+    def syncRemoteAddonsFeed(self, favorites_url, table_name):
+        """
+        Downloads favorites feed if it changed since the last sync and writes
+        the changes to table_name. This runs on a worker thread, so it uses its
+        own database connection.
+        """
+        conn = self.connectDB()
+        try:
+            c = conn.cursor()
+
+            headers = {}
+            for entry in c.execute(
+                "SELECT ETag, LastModified FROM tableCatalogSync WHERE TableName = ?",
+                (table_name,),
+            ):
+                if entry[0]:
+                    headers["If-None-Match"] = entry[0]
+                if entry[1]:
+                    headers["If-Modified-Since"] = entry[1]
+
+            try:
+                response = urllib.request.urlopen(  # nosec
+                    urllib.request.Request(favorites_url, headers=headers)
+                )
+            except urllib.error.HTTPError as error:
+                # Feed hasn't changed since the last sync
+                if error.code == 304:
+                    return
+                raise
+
+            # Feed is parsed and written to the database while it downloads
+            with response:
+                self.syncRemoteAddons(
+                    conn, table_name, self.parseRemoteAddons(response)
+                )
+
+            # Sync state is only saved once the whole feed is written, so an
+            # interrupted sync is redone next time.
+            c.execute(
+                "INSERT OR REPLACE INTO tableCatalogSync VALUES(?, ?, ?, ?)",
+                (
+                    table_name,
+                    response.headers.get("ETag", ""),
+                    response.headers.get("Last-Modified", ""),
+                    time(),
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def parseRemoteAddons(self, addons_file):
+        """
+        Yields the row and raw UIUpdated value for each addon in a favorites
+        feed as soon as it is read from the addons_file file object
+        """
+        # Elements that have been started but not ended yet
+        parents = []
+        for event, element in defusedxml.ElementTree.iterparse(
+            addons_file, events=("start", "end")
+        ):
+            if event == "start":
+                parents.append(element)
+                continue
+
+            parents.pop()
+            if element.tag != "Ui":
+                continue
+
             items_row = [""] * (len(self.COLUMN_LIST) - 1)
-            nodes = tag.childNodes
-            for node in nodes:
-                if node.nodeName == "UIName":
-                    items_row[0] = GetText(node.childNodes)
-                elif node.nodeName == "UIAuthorName":
-                    items_row[3] = GetText(node.childNodes)
-                elif node.nodeName == "UICategory":
-                    items_row[1] = GetText(node.childNodes)
-                elif node.nodeName == "UID":
-                    items_row[6] = GetText(node.childNodes)
-                elif node.nodeName == "UIVersion":
-                    items_row[2] = GetText(node.childNodes)
-                elif node.nodeName == "UIUpdated":
-                    items_row[4] = strftime(
-                        "%Y-%m-%d", localtime(int(GetText(node.childNodes)))
-                    )
-                elif node.nodeName == "UIFileURL":
-                    items_row[5] = GetText(node.childNodes)
+            items_row[0] = element.findtext("UIName", "")
+            items_row[1] = element.findtext("UICategory", "")
+            items_row[2] = element.findtext("UIVersion", "")
+            items_row[3] = element.findtext("UIAuthorName", "")
+            items_row[5] = element.findtext("UIFileURL", "")
+            items_row[6] = element.findtext("UID", "")
 
-            # Prepends name with (Installed) if already installed
-            if items_row[6] in installed_IDs:
-                items_row[0] = "(Installed) " + items_row[0]
+            updated = element.findtext("UIUpdated", "")
+            if updated:
+                items_row[4] = strftime("%Y-%m-%d", localtime(int(updated)))
 
-            self.addRowToDB(table, items_row)
+            # Parsed addons are removed from the tree, so it doesn't grow
+            if parents:
+                parents[-1].remove(element)
 
-        # Populate user visible table. This should not reload the current search.
-        self.searchDB(table, "")
+            yield items_row, updated
 
-        return True
+    def syncRemoteAddons(self, conn, table_name, addons):
+        """
+        Writes addons that aren't in the remote addons table yet or have a
+        different UIVersion or UIUpdated than last time, and removes the
+        ones that aren't in addons anymore. Writes are committed in batches of
+        SYNC_BATCH_SIZE while addons is still being parsed, so syncs of
+        other feeds can write in between.
+        """
+        c = conn.cursor()
+
+        synced_addons = {}
+        for entry in c.execute(
+            "SELECT InterfaceID, FTSRowid, UIVersion, UIUpdated FROM"
+            " tableCatalogAddons WHERE TableName = ?",
+            (table_name,),
+        ).fetchall():
+            synced_addons[entry[0]] = (entry[1], entry[2], entry[3])
+
+        # Rowids are given out here, so rows can be inserted with executemany
+        next_rowid = c.execute(
+            "SELECT COALESCE(MAX(rowid), 0) + 1 FROM {table}".format(  # nosec
+                table=table_name
+            )
+        ).fetchone()[0]
+
+        feed_IDs = set()
+        deleted_rowids = []
+        new_rows = []
+        new_synced_addons = []
+        for items_row, updated in addons:
+            interface_id = items_row[6]
+            feed_IDs.add(interface_id)
+
+            synced_addon = synced_addons.get(interface_id)
+            if synced_addon:
+                if synced_addon[1:] == (items_row[2], updated):
+                    continue
 
-    # Downloads file from url to path and shows progress with self.handleDownloadProgress
-    def downloader(self, url, path):
-        if url.lower().startswith("http"):
-            try:
-                urllib.request.urlretrieve(  # nosec
-                    url, path, self.handleDownloadProgress
+                deleted_rowids.append((synced_addon[0],))
+
+            synced_addons[interface_id] = (next_rowid, items_row[2], updated)
+            new_rows.append([next_rowid] + items_row)
+            new_synced_addons.append(
+                (table_name, interface_id, next_rowid, items_row[2], updated)
+            )
+            next_rowid += 1
+
+            if len(new_rows) >= self.SYNC_BATCH_SIZE:
+                self.writeRemoteAddonsBatch(
+                    c, table_name, deleted_rowids, new_rows, new_synced_addons
                 )
-            except (urllib.error.URLError, urllib.error.HTTPError) as error:
-                self.logger.error(error.reason, exc_info=True)
-                self.addLog(
-                    "There was a network error. You may want to check your connection."
+                conn.commit()
+                deleted_rowids, new_rows, new_synced_addons = [], [], []
+
+        for interface_id, synced_addon in synced_addons.items():
+            if interface_id not in feed_IDs:
+                deleted_rowids.append((synced_addon[0],))
+                c.execute(
+                    "DELETE FROM tableCatalogAddons WHERE TableName = ? AND"
+                    " InterfaceID = ?",
+                    (table_name, interface_id),
                 )
-                return False
-        else:
-            raise ValueError from None
 
-        self.winAddonManager.progressBar.setValue(0)
-        return True
+        self.writeRemoteAddonsBatch(
+            c, table_name, deleted_rowids, new_rows, new_synced_addons
+        )
 
-    def handleDownloadProgress(self, index, frame, size):
-        # Updates progress bar with download progress
-        percent = 100 * index * frame // size
-        self.winAddonManager.progressBar.setValue(percent)
+    def writeRemoteAddonsBatch(
+        self, c, table_name, deleted_rowids, new_rows, synced_addons
+    ):
+        c.executemany(
+            "DELETE FROM {table} WHERE rowid = ?".format(table=table_name),  # nosec
+            deleted_rowids,
+        )
+        c.executemany(
+            "INSERT INTO {table}(rowid, {columns}) VALUES({})".format(  # nosec
+                "?," + self.ROW_PLACEHOLDERS,
+                table=table_name,
+                columns=", ".join(self.COLUMN_LIST[1:]),
+            ),
+            new_rows,
+        )
+        c.executemany(
+            "INSERT OR REPLACE INTO tableCatalogAddons(TableName, InterfaceID,"
+            " FTSRowid, UIVersion, UIUpdated) VALUES(?, ?, ?, ?, ?)",
+            synced_addons,
+        )
+
+    def resetRemoteAddonsStatus(self, table):
+        """
+        Marks installed addons in remote addons table and clears the update
+        indicators left from the last time, because they are found again by
+        getOutOfDateAddons.
+        """
+        self.c.execute(
+            "UPDATE tableCatalogAddons SET Installed = InterfaceID IN"  # nosec
+            " (SELECT InterfaceID FROM {table_installed}), Outdated = 0 WHERE"
+            " TableName = ?".format(table_installed=table.objectName() + "Installed"),
+            (table.objectName(),),
+        )
 
     def Run(self):
         self.winAddonManager.exec()
+        self.addon_search.close()
+        self.download_manager.close()
         self.closeDB()
 
     def contextMenuRequested(self, cursor_position):
@@ -1584,11 +2869,11 @@ class AddonManager:
         parent_widget = selected_widget.parent()
         if parent_widget.objectName().startswith("table"):
             self.context_menu_selected_table = parent_widget
-            selected_item = self.context_menu_selected_table.itemAt(
+            selected_index = self.context_menu_selected_table.indexAt(
                 selected_widget.mapFromGlobal(global_cursor_position)
             )
-            if selected_item:
-                self.context_menu_selected_row = selected_item.row()
+            if selected_index.isValid():
+                self.context_menu_selected_row = selected_index.row()
 
                 # If addon has online page
                 self.context_menu_selected_interface_ID = self.getTableRowInterfaceID(
@@ -1603,9 +2888,8 @@ class AddonManager:
                     menu.addAction(self.winAddonManager.actionShowAddonInFileManager)
                 else:
                     # If addon in remote table is installed
-                    if (
-                        selected_item.background().color()
-                        == self.installed_addons_color
+                    if self.context_menu_selected_table.model().isRowInstalled(
+                        self.context_menu_selected_row
                     ):
                         menu.addAction(self.winAddonManager.actionUninstallAddon)
                         menu.addAction(
@@ -1615,11 +2899,9 @@ class AddonManager:
                         menu.addAction(self.winAddonManager.actionInstallAddon)
 
                 # If addon has a new version available
-                version_item = self.context_menu_selected_table.item(
-                    self.context_menu_selected_row, 3
-                )
-                version_color = version_item.foreground().color()
-                if version_color in [QtGui.QColor("crimson"), QtGui.QColor("green")]:
+                if self.context_menu_selected_table.model().isRowOutdated(
+                    self.context_menu_selected_row
+                ):
                     menu.addAction(self.winAddonManager.actionUpdateAddon)
 
                 # If addon has a statup script
@@ -1640,8 +2922,8 @@ class AddonManager:
         else:
             return None
 
-    def getTableRowInterfaceID(self, table: QtWidgets.QTableWidget, row: int):
-        addon_db_id = table.item(row, 0).text()
+    def getTableRowInterfaceID(self, table: QtWidgets.QTableView, row: int):
+        addon_db_id = self.getTableRowData(table, row, 0)
 
         for interface_ID in self.c.execute(
             "SELECT InterfaceID FROM {table} WHERE rowid = ?".format(  # nosec
@@ -1665,7 +2947,7 @@ class AddonManager:
             QtGui.QDesktopServices.openUrl(url)
 
     def getAddonUrlFromInterfaceID(
-        self, interface_ID, table: QtWidgets.QTableWidget, download_url: bool = False
+        self, interface_ID, table: QtWidgets.QTableView, download_url: bool = False
     ):
         """Returns info URL for addon or download URL if download_url=True"""
         # URL is only in remote version of table
@@ -1720,8 +3002,7 @@ class AddonManager:
         row = self.context_menu_selected_row
         addon = self.getAddonListObjectFromRow(table, row)
 
-        self.installRemoteAddon(addon[1], addon[2], addon[0])
-        self.setRemoteAddonToInstalled(addon, table)
+        self.installRemoteAddonsWithDependencies([addon[0]], table)
 
         self.resetRemoteAddonsTables()
         self.searchSearchBarContents()
@@ -1734,16 +3015,14 @@ class AddonManager:
         if self.confirmationPrompt(
             "Are you sure you want to uninstall this addon?", addon[2]
         ):
-            uninstall_function = self.getUninstallFunctionFromTable(table)
-
             table_installed = self.getRemoteOrLocalTableFromOne(table, remote=False)
-            uninstall_function([addon], table_installed)
+            self.uninstallAddonsAndOrphans([addon], table_installed)
 
             self.resetRemoteAddonsTables()
             self.searchSearchBarContents()
 
     def getAddonListObjectFromRow(
-        self, table: QtWidgets.QTableWidget, row, remote=True
+        self, table: QtWidgets.QTableView, row, remote=True
     ):
         """
         Gives list of information for addon. The information is:
@@ -1766,16 +3045,16 @@ class AddonManager:
                     "SELECT File FROM {table} WHERE rowid=?".format(  # nosec
                         table=table_installed.objectName()
                     ),
-                    (table_installed.item(row, 0).text(),),
+                    (self.getTableRowData(table_installed, row, 0),),
                 ):
                     file = item[0]
             else:
                 file = self.getAddonFileFromInterfaceID(interface_ID, table_installed)
 
-        return [interface_ID, file, table.item(row, 1).text()]
+        return [interface_ID, file, self.getTableRowData(table, row, 1)]
 
     def getRemoteOrLocalTableFromOne(
-        self, input_table: QtWidgets.QTableWidget, remote: bool = False
+        self, input_table: QtWidgets.QTableView, remote: bool = False
     ):
         table_name = input_table.objectName()
         # UI table object names are renamed with DDO in them when the current game is
@@ -1837,9 +3116,9 @@ class AddonManager:
 
     def getOutOfDateAddons(self):
         """
-        Marks addons as out of date in database with '(Outdated) '
-        in installed table and '(Updated) ' in remote table. These
-        are prepended to the Version column.
+        Marks installed addons with a different version than the remote
+        addon as outdated in tableCatalogAddons. This is one statement per
+        table, and all of them are one transaction.
         """
         if not self.loadRemoteDataIfNotDone():
             return
@@ -1853,65 +3132,24 @@ class AddonManager:
         else:
             tables = ["tableSkinsInstalled"]
 
-        for db_table in tables:
-            table_installed = getattr(self.winAddonManager, db_table)
-            table_remote = self.getRemoteOrLocalTableFromOne(
-                table_installed, remote=True
-            )
-
-            addons_info_remote = {}
-            for addon in self.c.execute(
-                "SELECT Version, InterfaceID, rowid FROM {table_remote} WHERE"  # nosec
-                " Name LIKE '(Installed) %'".format(
-                    table_remote=table_remote.objectName()
-                )
-            ):
-                addons_info_remote[addon[1]] = (addon[0], addon[2])
-
-            out_of_date_addons = []
-            for addon in self.c.execute(
-                "SELECT Version, InterfaceID, rowid FROM {table_installed} WHERE"  # nosec
-                " InterfaceID != ''".format(
-                    table_installed=table_installed.objectName()
+        with self.conn:
+            for db_table in tables:
+                table_installed = getattr(self.winAddonManager, db_table)
+                table_remote = self.getRemoteOrLocalTableFromOne(
+                    table_installed, remote=True
                 )
-            ):
-                # Will raise KeyError if addon has Interface ID that isn't in remote table.
-                try:
-                    remote_addon_info = addons_info_remote[addon[1]]
-                except KeyError:
-                    continue
-
-                latest_version = remote_addon_info[0]
-                if addon[0] != latest_version:
-                    rowid_remote = remote_addon_info[1]
-                    out_of_date_addons.append((addon[2], rowid_remote, table_installed))
-
-            for addon in out_of_date_addons:
-                self.markAddonForUpdating(addon[0], addon[1], addon[2])
 
-    def markAddonForUpdating(self, rowid_local, rowid_remote, table_installed):
-        """
-        Marks addon as having having updates
-        available in installed and remote tables
-        """
-        table_remote = self.getRemoteOrLocalTableFromOne(table_installed, remote=True)
-
-        self.c.execute(
-            (
-                "UPDATE {table} SET Version=('(Outdated) ' || Version) WHERE rowid=?".format(  # nosec
-                    table=table_installed.objectName()
-                )
-            ),
-            (str(rowid_local),),
-        )
-        self.c.execute(
-            (
-                "UPDATE {table} SET Version=('(Updated) ' || Version) WHERE rowid=?".format(  # nosec
-                    table=table_remote.objectName()
+                self.c.execute(
+                    "UPDATE tableCatalogAddons SET Outdated = InterfaceID IN"  # nosec
+                    " (SELECT installed.InterfaceID FROM {table_installed} AS"
+                    " installed JOIN tableCatalogAddons AS catalog ON"
+                    " catalog.TableName = ? AND catalog.InterfaceID ="
+                    " installed.InterfaceID WHERE installed.Version !="
+                    " catalog.UIVersion) WHERE TableName = ? AND Installed = 1".format(
+                        table_installed=table_installed.objectName()
+                    ),
+                    (table_remote.objectName(), table_remote.objectName()),
                 )
-            ),
-            (str(rowid_remote),),
-        )
 
     def updateAll(self):
         if not self.loadRemoteDataIfNotDone():
@@ -1924,10 +3162,15 @@ class AddonManager:
 
         for db_table in tables:
             table = getattr(self.winAddonManager, db_table)
+            table_remote = self.getRemoteOrLocalTableFromOne(table, remote=True)
             for addon in self.c.execute(
                 "SELECT InterfaceID, File, Name FROM {table} WHERE"  # nosec
-                " Version LIKE '(Outdated) %'".format(table=table.objectName())
-            ):
+                " InterfaceID IN (SELECT InterfaceID FROM tableCatalogAddons WHERE"
+                " TableName = ? AND Installed = 1 AND Outdated = 1)".format(
+                    table=table.objectName()
+                ),
+                (table_remote.objectName(),),
+            ).fetchall():
                 self.updateAddon(addon, table)
 
         self.resetRemoteAddonsTables()
@@ -1937,17 +3180,13 @@ class AddonManager:
         uninstall_function = self.getUninstallFunctionFromTable(table)
         table_installed = self.getRemoteOrLocalTableFromOne(table, remote=False)
         table_remote = self.getRemoteOrLocalTableFromOne(table, remote=True)
+        if uninstall_function == self.uninstallPlugins:
+            addon = self.getManagedPluginAddon(addon)
 
-        uninstall_function([addon], table_installed)
+        with self.ignoreAddonFolderChanges():
+            uninstall_function([addon], table_installed)
 
-        for entry in self.c.execute(
-            "SELECT File FROM {table} WHERE"  # nosec
-            " InterfaceID = ?".format(table=table_remote.objectName()),
-            (addon[0],),
-        ):
-            url = entry[0]
-        self.installRemoteAddon(url, addon[2], addon[0])
-        self.setRemoteAddonToInstalled(addon, table_remote)
+        self.installRemoteAddonsWithDependencies([addon[0]], table_remote)
 
     def actionUpdateAddonSelected(self):
         if not self.loadRemoteDataIfNotDone():
@@ -1978,16 +3217,13 @@ class AddonManager:
             self.searchSearchBarContents()
 
     def checkIfAddonHasUpdate(self, addon, table):
+        table_remote = self.getRemoteOrLocalTableFromOne(table, remote=True)
         for entry in self.c.execute(
-            "SELECT Version FROM {table} WHERE InterfaceID = ?".format(  # nosec
-                table=table.objectName()
-            ),
-            (addon[0],),
+            "SELECT Outdated FROM tableCatalogAddons WHERE TableName = ? AND"
+            " InterfaceID = ?",
+            (table_remote.objectName(), addon[0]),
         ):
-            version = entry[0]
-            return bool(
-                version.startswith("(Outdated) ") or version.startswith("(Updated) ")
-            )
+            return bool(entry[0])
 
     def loadRemoteDataIfNotDone(self):
         """
@@ -2019,7 +3255,7 @@ class AddonManager:
         self.startupScripts.remove(script)
 
     def getRelativeStartupScriptFromInterfaceID(
-        self, table: QtWidgets.QTableWidget, interface_ID
+        self, table: QtWidgets.QTableView, interface_ID
     ):
         """Returns path of startup script relative to game documents settings directory"""
         table_local = self.getRemoteOrLocalTableFromOne(table, remote=False)
@@ -2035,7 +3271,7 @@ class AddonManager:
 
                 return os.path.join(addon_data_folder_relative, script).strip(os.sep)
 
-    def getAddonTypeDataFolderFromTable(self, table: QtWidgets.QTableWidget):
+    def getAddonTypeDataFolderFromTable(self, table: QtWidgets.QTableView):
         table_name = table.objectName()
         if "Plugins" in table_name:
             return self.data_folder_plugins
@@ -2047,7 +3283,7 @@ class AddonManager:
             return None
 
     def handleStartupScriptActivationPrompt(
-        self, table: QtWidgets.QTableWidget, interface_ID: str
+        self, table: QtWidgets.QTableView, interface_ID: str
     ):
         """Asks user if they want to enable an add-on's startup script if present"""
         script = self.getRelativeStartupScriptFromInterfaceID(table, interface_ID)
@@ -2083,3 +3319,303 @@ class AddonManager:
             if os.path.exists(script_path):
                 os.remove(script_path)
 
+
+class AddonsTableModel(QtCore.QAbstractTableModel):
+    """
+    Model for the rows of an addons database table. Rows are given to views
+    FETCH_SIZE at a time as they are scrolled to. Sorting is done here with
+    list.sort, because sorting in a proxy model calls data() for every
+    comparison.
+    """
+
+    FETCH_SIZE = 256
+    HEADERS = ["ID", "Name", "Category", "Version", "Author", "Latest Release"]
+    # Positions of the status values after the database columns in rows
+    INSTALLED_INDEX = len(AddonManager.COLUMN_LIST)
+    OUTDATED_INDEX = len(AddonManager.COLUMN_LIST) + 1
+
+    def __init__(self, installed_addons_color, remote, parent=None):
+        super().__init__(parent)
+        self.installed_addons_color = installed_addons_color
+        # Outdated addons are shown differently in remote and installed tables
+        self.remote = remote
+        # Rows in the order of the database query
+        self.query_rows = []
+        self.rows = []
+        self.fetched_rows = 0
+
+    def setRows(self, rows):
+        """Replaces rows with a list of getSearchStatement query results"""
+        self.beginResetModel()
+        self.query_rows = rows
+        self.rows = list(rows)
+        self.fetched_rows = min(len(rows), self.FETCH_SIZE)
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self.fetched_rows
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.fetched_rows < len(self.rows)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+
+        count = min(len(self.rows) - self.fetched_rows, self.FETCH_SIZE)
+        self.beginInsertRows(
+            QtCore.QModelIndex(), self.fetched_rows, self.fetched_rows + count - 1
+        )
+        self.fetched_rows += count
+        self.endInsertRows()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """Column -1 restores the order of the database query"""
+        self.layoutAboutToBeChanged.emit()
+
+        # rowid is the first value of every row
+        persistent_indexes = [
+            (index, self.rows[index.row()][0]) for index in self.persistentIndexList()
+        ]
+
+        if column < 0:
+            self.rows = list(self.query_rows)
+        else:
+            self.rows = sorted(
+                self.query_rows,
+                key=lambda row: self.getDisplayText(row, column).casefold(),
+                reverse=order == QtCore.Qt.DescendingOrder,
+            )
+
+        new_positions = {row[0]: position for position, row in enumerate(self.rows)}
+        for index, rowid in persistent_indexes:
+            position = new_positions[rowid]
+            if position < self.fetched_rows:
+                self.changePersistentIndex(index, self.index(position, index.column()))
+            else:
+                self.changePersistentIndex(index, QtCore.QModelIndex())
+
+        self.layoutChanged.emit()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def isRowInstalled(self, row):
+        """Only applicable to remote tables"""
+        return bool(self.rows[row][self.INSTALLED_INDEX])
+
+    def isRowOutdated(self, row):
+        return bool(self.rows[row][self.OUTDATED_INDEX])
+
+    def flags(self, index):
+        # Installed addons can't be selected in remote tables
+        if self.isRowInstalled(index.row()):
+            return QtCore.Qt.ItemIsEnabled
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+    def getDisplayText(self, row, column):
+        return str(row[column])
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        column = index.column()
+        row = self.rows[index.row()]
+
+        if role == QtCore.Qt.DisplayRole:
+            return self.getDisplayText(row, column)
+        elif role == QtCore.Qt.ForegroundRole:
+            # Sets color to red if addon is unmanaged
+            if column == 2 and row[column] == "Unmanaged":
+                return QtGui.QColor("darkred")
+            elif column == 3 and self.isRowOutdated(index.row()):
+                return QtGui.QColor("green" if self.remote else "crimson")
+        elif role == QtCore.Qt.BackgroundRole:
+            if self.isRowInstalled(index.row()):
+                return self.installed_addons_color
+
+        return None
+
+
+class FutureWatcher(QtCore.QObject):
+    """Calls callback with futures on the thread of the watcher once they are done"""
+
+    # Emitted from the threads that finish the futures
+    FutureDone = QtCore.Signal(object)
+
+    def __init__(self, callback, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+        self.FutureDone.connect(self.futureDone)
+
+    def watch(self, future):
+        future.add_done_callback(self.FutureDone.emit)
+
+    def futureDone(self, future):
+        self.callback(future)
+
+
+class AddonSearch(QtCore.QObject):
+    """
+    Searches the table the user sees as they type. Searches wait until
+    typing pauses, run on a background database connection, and cancel
+    the one still running. A search that only adds to the previous one
+    just looks through its results.
+    """
+
+    # Milliseconds to wait for more typing before searching
+    SEARCH_DELAY = 150
+    # Most previous results that are searched through instead of the table
+    MAX_REFINED_RESULTS = 500
+
+    ReturnSearchResults = QtCore.Signal(int, object)
+
+    def __init__(self, addon_manager, parent=None):
+        super().__init__(parent)
+        self.addon_manager = addon_manager
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.SEARCH_DELAY)
+        self.timer.timeout.connect(self.search)
+
+        # Searches run one at a time on a thread with its own connection
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.conn = None
+
+        # Only results of the latest search are shown
+        self.search_number = 0
+        self.text = ""
+        self.table = None
+        self.terms = []
+        self.previous_table = None
+        self.previous_terms = []
+        self.previous_rows = []
+
+        self.ReturnSearchResults.connect(self.showResults)
+
+    def searchLater(self, text):
+        self.text = text
+        self.timer.start()
+
+    def cancel(self):
+        """
+        Stops searches that haven't been shown yet. Used when the table
+        is searched or changed directly.
+        """
+        self.timer.stop()
+        self.stopRunningSearch()
+
+        # Previous results can be outdated now
+        self.previous_table = None
+
+    def stopRunningSearch(self):
+        self.search_number += 1
+        if self.conn:
+            self.conn.interrupt()
+
+    def search(self):
+        self.stopRunningSearch()
+
+        self.table = self.addon_manager.getCurrentTable()
+        self.terms = self.addon_manager.getSearchTerms(self.text)
+
+        rowids = None
+        if self.isRefinement(self.table, self.terms):
+            rowids = [row[0] for row in self.previous_rows]
+
+        sql, parameters = self.addon_manager.getSearchStatement(
+            self.table.objectName(), self.terms, rowids
+        )
+
+        # Background connection only sees committed changes
+        self.addon_manager.conn.commit()
+
+        self.executor.submit(self.runSearch, self.search_number, sql, parameters)
+
+    def isRefinement(self, table, terms):
+        """
+        Returns True if terms can only match rows that the previous search
+        matched. This is the case when every previous word is the start of
+        the word in the same place, like "bag tr" after "bag t".
+        """
+        if (
+            table is not self.previous_table
+            or not self.previous_terms
+            or len(self.previous_rows) > self.MAX_REFINED_RESULTS
+            or len(terms) < len(self.previous_terms)
+        ):
+            return False
+
+        for (previous_columns, previous_word), (columns, word) in zip(
+            self.previous_terms, terms
+        ):
+            if previous_columns != columns or not word.startswith(previous_word):
+                return False
+
+        return True
+
+    def runSearch(self, search_number, sql, parameters):
+        """Runs on the search thread"""
+        # Search was replaced while it was waiting to run
+        if search_number != self.search_number:
+            return
+
+        if not self.conn:
+            self.conn = self.addon_manager.connectDB(check_same_thread=False)
+
+        try:
+            rows = self.conn.execute(sql, parameters).fetchall()
+        except sqlite3.OperationalError:
+            # Search was interrupted by a newer one
+            return
+
+        self.ReturnSearchResults.emit(search_number, rows)
+
+    def showResults(self, search_number, rows):
+        if search_number != self.search_number:
+            return
+
+        self.previous_table = self.table
+        self.previous_terms = self.terms
+        self.previous_rows = rows
+
+        self.addon_manager.showSearchResults(self.table, rows, bool(self.terms))
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown()
+        if self.conn:
+            self.conn.close()
+
+
+def getDependencyOrder(graph):
+    """
+    Sorts graph, a dictionary of node to the set of nodes it depends on,
+    so dependencies come before the nodes that need them. Returns the
+    sorted nodes and a list of the nodes that couldn't be sorted,
+    because they are part of or depend on a dependency cycle.
+    """
+    dependents = {node: [] for node in graph}
+    dependencies_left = {}
+    for node, dependencies in graph.items():
+        dependencies_left[node] = len(dependencies)
+        for dependency in dependencies:
+            dependents[dependency].append(node)
+
+    order = [node for node, count in dependencies_left.items() if not count]
+    # order grows while it is iterated over
+    for node in order:
+        for dependent in dependents[node]:
+            dependencies_left[dependent] -= 1
+            if not dependencies_left[dependent]:
+                order.append(dependent)
+
+    sorted_nodes = set(order)
+    return order, [node for node in graph if node not in sorted_nodes]
@@ -0,0 +1,324 @@
+# coding=utf-8
+###########################################################################
+# Download manager for OneLauncher.
+#
+# This file is part of OneLauncher
+#
+# OneLauncher is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# OneLauncher is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OneLauncher.  If not, see <http://www.gnu.org/licenses/>.
+###########################################################################
+import os
+import json
+import logging
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide2 import QtCore
+
+
+class DownloadManager(QtCore.QObject):
+    """
+    Downloads files in the background, MAX_PARALLEL_DOWNLOADS at a time.
+    Files are written to a .part file next to their path, which later
+    attempts continue with a Range request. The ETag or Last-Modified
+    value the .part file came from is sent with If-Range, so a .part file
+    of a file that has changed since is downloaded again from the start.
+    Queued downloads are saved to queue_path, so downloads that didn't
+    finish are resumed by resume() the next time.
+
+    Downloads are dictionaries with url, path and whatever else was given to
+    add(), and are what the Return signals are emitted with.
+    """
+
+    MAX_PARALLEL_DOWNLOADS = 4
+    MAX_ATTEMPTS = 4
+    # Seconds to wait before the first retry. It doubles after every retry.
+    RETRY_DELAY = 2
+    SOCKET_TIMEOUT = 20
+    CHUNK_SIZE = 64 * 1024
+
+    ReturnProgress = QtCore.Signal(int)
+    ReturnDownloadFinished = QtCore.Signal(object)
+    ReturnDownloadFailed = QtCore.Signal(object)
+    ReturnQueueFinished = QtCore.Signal()
+
+    # Emitted from the download threads with the download and if it succeeded
+    DownloadDone = QtCore.Signal(object, bool)
+
+    def __init__(self, queue_path, parent=None):
+        super().__init__(parent)
+        self.queue_path = queue_path
+        self.logger = logging.getLogger("OneLauncher")
+
+        self.downloads = []
+        # Held while downloads is changed or saved, because download threads
+        # save the queue when they get the validator of a download
+        self.downloads_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(self.MAX_PARALLEL_DOWNLOADS)
+        # Futures of downloads that haven't finished, so queued ones can be
+        # cancelled on close
+        self.futures = set()
+        self.futures_lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.closed = False
+
+        # Path is the key and (received bytes, total bytes) is the value
+        self.progress = {}
+        self.progress_lock = threading.Lock()
+        self.last_percent = 0
+
+        self.DownloadDone.connect(self.downloadDone)
+
+    def add(self, url, path, **info):
+        """
+        Queues download of url to path. Returns False if a download
+        to path is already queued.
+        """
+        if not url.lower().startswith("http"):
+            raise ValueError from None
+
+        if any(download["path"] == path for download in self.downloads):
+            return False
+
+        # Files left from downloads that aren't queued anymore are out of
+        # date, and it isn't known what their .part files came from
+        for old_path in (path, path + ".part"):
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+        download = dict(info, url=url, path=path)
+        with self.downloads_lock:
+            self.downloads.append(download)
+        self.saveQueue()
+        self.start(download)
+        return True
+
+    def resume(self, keep=None):
+        """
+        Starts the downloads that were queued last time. keep is called with
+        each of them and returns if it should be resumed. The files of the
+        others are removed.
+        """
+        try:
+            with open(self.queue_path, "r") as file:
+                downloads = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        for download in downloads:
+            if any(queued["path"] == download["path"] for queued in self.downloads):
+                continue
+
+            if keep and not keep(download):
+                for old_path in (download["path"], download["path"] + ".part"):
+                    if os.path.exists(old_path):
+                        os.remove(old_path)
+                continue
+
+            with self.downloads_lock:
+                self.downloads.append(download)
+            self.start(download)
+
+        self.saveQueue()
+
+    def getQueuedDownload(self, path):
+        """Returns the queued download to path or None if there isn't one"""
+        with self.downloads_lock:
+            for download in self.downloads:
+                if download["path"] == path:
+                    return download
+
+        return None
+
+    def isBusy(self):
+        return bool(self.downloads)
+
+    def start(self, download):
+        with self.progress_lock:
+            self.progress[download["path"]] = (0, 0)
+        future = self.executor.submit(self.runDownload, download)
+        with self.futures_lock:
+            self.futures.add(future)
+        future.add_done_callback(self.removeFuture)
+
+    def removeFuture(self, future):
+        with self.futures_lock:
+            self.futures.discard(future)
+
+    def saveQueue(self):
+        with self.downloads_lock:
+            with open(self.queue_path, "w") as file:
+                json.dump(self.downloads, file)
+
+    def runDownload(self, download):
+        """Downloads download with retries. Runs in the download threads."""
+        path = download["path"]
+        part_path = path + ".part"
+
+        # Downloads that were finished before being installed last time
+        if os.path.exists(path) and not os.path.exists(part_path):
+            self.DownloadDone.emit(download, True)
+            return
+
+        delay = self.RETRY_DELAY
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                if not self.downloadFile(download, path, part_path):
+                    # Cancelled downloads stay queued for next time
+                    return
+
+                os.replace(part_path, path)
+                self.DownloadDone.emit(download, True)
+                return
+            except urllib.error.HTTPError as error:
+                self.logger.warning(
+                    "Downloading %s failed on attempt %s: %s",
+                    download["url"],
+                    attempt,
+                    error,
+                )
+                if error.code == 416:
+                    # The .part file doesn't fit what the server has anymore
+                    os.remove(part_path)
+                elif error.code < 500 and error.code not in (408, 429):
+                    break
+            except (urllib.error.URLError, OSError) as error:
+                self.logger.warning(
+                    "Downloading %s failed on attempt %s: %s",
+                    download["url"],
+                    attempt,
+                    error,
+                )
+
+            if attempt < self.MAX_ATTEMPTS:
+                if self.cancel_event.wait(delay):
+                    return
+                delay *= 2
+
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        self.DownloadDone.emit(download, False)
+
+    def downloadFile(self, download, path, part_path):
+        """
+        Downloads the url of download to part_path, continuing from what is
+        already in part_path if it is from the same version of the file.
+        Returns False if the download was cancelled.
+        """
+        validator = download.get("validator")
+        received = 0
+        if validator and os.path.exists(part_path):
+            received = os.path.getsize(part_path)
+
+        request = urllib.request.Request(download["url"])
+        if received:
+            request.add_header("Range", "bytes=%s-" % received)
+            request.add_header("If-Range", validator)
+
+        with urllib.request.urlopen(  # nosec
+            request, timeout=self.SOCKET_TIMEOUT
+        ) as response:
+            # Servers send the whole file when it changed since the .part
+            # file was started or when they don't support ranges
+            if response.status == 206:
+                mode = "ab"
+            else:
+                mode = "wb"
+                received = 0
+
+                validator = response.headers.get("ETag") or response.headers.get(
+                    "Last-Modified"
+                )
+                # Weak ETags can't be used with If-Range
+                if validator and validator.startswith("W/"):
+                    validator = None
+                if validator != download.get("validator"):
+                    with self.downloads_lock:
+                        download["validator"] = validator
+                    self.saveQueue()
+
+            length = response.headers.get("Content-Length")
+            total = received + int(length) if length else 0
+            self.setProgress(path, received, total)
+
+            with open(part_path, mode) as file:
+                while True:
+                    if self.cancel_event.is_set():
+                        return False
+
+                    chunk = response.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+
+                    file.write(chunk)
+                    received += len(chunk)
+                    self.setProgress(path, received, total)
+
+        if total and received < total:
+            raise OSError("Connection closed after %s of %s bytes" % (received, total))
+
+        return True
+
+    def setProgress(self, path, received, total):
+        """Emits progress of all queued downloads when the percentage changes"""
+        with self.progress_lock:
+            self.progress[path] = (received, total)
+
+            received_all = sum(progress[0] for progress in self.progress.values())
+            total_all = sum(progress[1] for progress in self.progress.values())
+            percent = 100 * received_all // total_all if total_all else 0
+
+            if percent == self.last_percent:
+                return
+            self.last_percent = percent
+
+        self.ReturnProgress.emit(percent)
+
+    def downloadDone(self, download, succeeded):
+        # Downloads finishing while closing are handled by resume() next time
+        if self.closed:
+            return
+
+        with self.downloads_lock:
+            self.downloads.remove(download)
+        self.saveQueue()
+
+        with self.progress_lock:
+            del self.progress[download["path"]]
+
+        if succeeded:
+            self.ReturnDownloadFinished.emit(download)
+        else:
+            self.ReturnDownloadFailed.emit(download)
+
+        if not self.downloads:
+            with self.progress_lock:
+                self.last_percent = 0
+            self.ReturnProgress.emit(0)
+            self.ReturnQueueFinished.emit()
+
+    def close(self):
+        """
+        Stops downloads without waiting for reads that are in progress.
+        Queued downloads are kept for resume().
+        """
+        self.closed = True
+        self.cancel_event.set()
+        # shutdown() only got cancel_futures in Python 3.9
+        with self.futures_lock:
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
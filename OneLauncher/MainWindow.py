@@ -29,7 +29,6 @@
 import os
 import sys
 import defusedxml.minidom
-import zlib
 from PySide2 import QtCore, QtGui, QtWidgets
 from PySide2.QtUiTools import QUiLoader
 import qdarkstyle
@@ -51,7 +50,8 @@ from OneLauncher.OneLauncherUtils import (
     AuthenticateUser,
     JoinWorldQueue,
     GetText,
-    WebConnection,
+    parseQueueNumber,
+    ResponseCache,
 )
 from OneLauncher import Information
 from pkg_resources import parse_version
@@ -64,17 +64,29 @@ import urllib
 # For setting global timeout used by urllib
 import socket
 from json import loads as jsonLoads
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from time import perf_counter, time, monotonic
+import hashlib
 
 
 class MainWindow(QtWidgets.QMainWindow):
     QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_ShareOpenGLContexts)
     app = QtWidgets.QApplication(sys.argv)
 
+    # Seconds before a login that hasn't finished is given up on
+    LOGIN_TIMEOUT = 30
+    # Seconds between refreshes of the status of all worlds
+    WORLD_STATUS_REFRESH_INTERVAL = 60
+
     ReturnLog = QtCore.Signal(str)
     ReturnBaseConfig = QtCore.Signal(BaseConfig)
     ReturnGLSDataCenter = QtCore.Signal(BaseConfig)
     ReturnWorldQueueConfig = QtCore.Signal(BaseConfig)
     ReturnNews = QtCore.Signal(str)
+    ReturnWorldQueueStatus = QtCore.Signal(int, int)
+    ReturnWorldQueueResult = QtCore.Signal(bool)
+    ReturnLoginResult = QtCore.Signal(object)
+    ReturnWorldStatus = QtCore.Signal(object)
 
     def __init__(self):
         super().__init__()
@@ -178,6 +190,23 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ReturnWorldQueueConfig.connect(self.GetWorldQueueConfig)
         self.ReturnNews = self.ReturnNews
         self.ReturnNews.connect(self.GetNews)
+        self.ReturnWorldQueueStatus = self.ReturnWorldQueueStatus
+        self.ReturnWorldQueueStatus.connect(self.GetWorldQueueStatus)
+        self.ReturnWorldQueueResult = self.ReturnWorldQueueResult
+        self.ReturnWorldQueueResult.connect(self.GetWorldQueueResult)
+        self.ReturnLoginResult = self.ReturnLoginResult
+        self.ReturnLoginResult.connect(self.GetLoginResult)
+
+        self.ReturnWorldStatus = self.ReturnWorldStatus
+        self.ReturnWorldStatus.connect(self.GetWorldStatus)
+
+        self.worldStatusTimer = QtCore.QTimer(self)
+        self.worldStatusTimer.setInterval(self.WORLD_STATUS_REFRESH_INTERVAL * 1000)
+        self.worldStatusTimer.timeout.connect(self.worldStatusTimerTimeout)
+
+        self.loginTimer = QtCore.QTimer(self)
+        self.loginTimer.setSingleShot(True)
+        self.loginTimer.timeout.connect(self.loginTimedOut)
 
         # Disable login and save settings buttons
         self.winMain.btnLogin.setEnabled(False)
@@ -189,6 +218,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.gameType = DetermineGame()
         self.configFile = ""
         self.currentGame = None
+        self.worldQueueThread = None
+        self.loginThread = None
+        self.worldStatusThread = None
+        self.configThread = None
 
         self.InitialSetup(first_setup=True)
 
@@ -196,6 +229,31 @@ class MainWindow(QtWidgets.QMainWindow):
         self.show()
         sys.exit(self.app.exec_())
 
+    def closeEvent(self, event):
+        """
+        Waits for threads to stop, because Qt aborts if a thread is destroyed
+        while it is still running. Login and world status threads are
+        parented to the window, and there can be more than one login thread
+        when logins were cancelled.
+        """
+        self.loginTimer.stop()
+        self.worldStatusTimer.stop()
+        # Window is hidden while threads finish requests that are in progress
+        self.hide()
+
+        threads = set(self.findChildren(QtCore.QThread))
+        threads.update(
+            thread
+            for thread in (self.worldQueueThread, self.configThread)
+            if thread is not None
+        )
+        for thread in threads:
+            thread.requestInterruption()
+        for thread in threads:
+            thread.wait()
+
+        super().closeEvent(event)
+
     def resetFocus(self):
         if self.winMain.cboAccount.currentText() == "":
             self.winMain.cboAccount.setFocus()
@@ -399,6 +457,15 @@ class MainWindow(QtWidgets.QMainWindow):
         self.InitialSetup()
 
     def btnLoginClicked(self):
+        # Login button cancels logging in and queueing while they are in progress
+        if self.isLoggingIn():
+            self.cancelLogin()
+            self.AddLog("Login cancelled")
+            return
+        if self.worldQueueThread and self.worldQueueThread.isRunning():
+            self.worldQueueThread.requestInterruption()
+            return
+
         if (
             self.winMain.cboAccount.currentText() == ""
             or self.winMain.txtPassword.text() == ""
@@ -457,23 +524,55 @@ class MainWindow(QtWidgets.QMainWindow):
     def AuthAccount(self):
         self.AddLog("Checking account details...")
 
-        # Force a small display to ensure message above is displayed
-        # as program can look like it is not responding while validating
-        for _ in range(4):
-            self.app.processEvents()
+        self.loginPassword = self.winMain.txtPassword.text()
+
+        # don't keep password longer in memory than required
+        if not self.winMain.chkSavePassword.isChecked():
+            self.winMain.txtPassword.clear()
 
-        self.account = AuthenticateUser(
+        # Thread is parented to the window, so it is kept alive if login is
+        # cancelled while it is still waiting on the server.
+        self.loginThread = LoginThread(self)
+        self.loginThread.SetUp(
             self.dataCenter.authServer,
             self.winMain.cboAccount.currentText(),
-            self.winMain.txtPassword.text(),
+            self.loginPassword,
             self.baseConfig.gameName,
+            self.dataCenter.worldList[self.winMain.cboWorld.currentIndex()],
             self.valHomeDir,
             self.osType,
+            self.ReturnLoginResult,
         )
+        self.loginThread.finished.connect(self.loginThread.deleteLater)
 
-        # don't keep password longer in memory than required
-        if not self.winMain.chkSavePassword.isChecked():
-            self.winMain.txtPassword.clear()
+        self.winMain.btnLogin.setText("Cancel")
+        self.loginTimer.start(self.LOGIN_TIMEOUT * 1000)
+        self.loginThread.start()
+
+    def isLoggingIn(self):
+        return self.loginTimer.isActive()
+
+    def cancelLogin(self):
+        self.loginTimer.stop()
+        self.loginThread.requestInterruption()
+        self.loginPassword = ""
+        self.winMain.btnLogin.setText("Play")
+
+    def loginTimedOut(self):
+        self.cancelLogin()
+        self.AddLog("[E20] Login timed out. The servers may be busy or down.")
+
+    def GetLoginResult(self, loginThread):
+        # Results from cancelled or timed out logins are ignored
+        if loginThread is not self.loginThread or not self.isLoggingIn():
+            return
+
+        self.loginTimer.stop()
+        self.winMain.btnLogin.setText("Play")
+
+        self.account = loginThread.account
+        password = self.loginPassword
+        self.loginPassword = ""
 
         if self.account.authSuccess:
             self.AddLog("Account authenticated")
@@ -506,13 +605,13 @@ class MainWindow(QtWidgets.QMainWindow):
                         keyring.set_password(
                             "OneLauncherDDO",
                             self.winMain.cboAccount.currentText(),
-                            self.winMain.txtPassword.text(),
+                            password,
                         )
                     else:
                         keyring.set_password(
                             "OneLauncherLOTRO",
                             self.winMain.cboAccount.currentText(),
-                            self.winMain.txtPassword.text(),
+                            password,
                         )
                 else:
                     try:
@@ -562,8 +661,8 @@ class MainWindow(QtWidgets.QMainWindow):
             else:
                 self.accNumber = self.account.gameList[0].name
 
-            tempWorld = self.dataCenter.worldList[self.winMain.cboWorld.currentIndex()]
-            tempWorld.CheckWorld(self.valHomeDir, self.osType)
+            # World status was checked alongside authentication
+            tempWorld = loginThread.world
 
             if tempWorld.worldAvailable:
                 self.urlChatServer = tempWorld.urlChatServer
@@ -617,7 +716,8 @@ class MainWindow(QtWidgets.QMainWindow):
         game.Run()
 
     def EnterWorldQueue(self, queueURL):
-        self.worldQueue = JoinWorldQueue(
+        self.worldQueueThread = WorldQueueThread()
+        self.worldQueueThread.SetUp(
             self.worldQueueConfig.worldQueueParam,
             self.accNumber,
             self.account.ticket,
@@ -625,36 +725,41 @@ class MainWindow(QtWidgets.QMainWindow):
             self.worldQueueConfig.worldQueueURL,
             self.valHomeDir,
             self.osType,
+            self.ReturnLog,
+            self.ReturnWorldQueueStatus,
+            self.ReturnWorldQueueResult,
         )
 
-        if self.worldQueue.joinSuccess:
-            self.AddLog("Joined world queue")
+        # Login button cancels queueing until it is done
+        self.winMain.btnLogin.setText("Cancel")
+        self.worldQueueStatusShown = False
+        self.worldQueueThread.start()
 
-            displayQueueing = True
+    def GetWorldQueueStatus(self, position, eta):
+        if eta < 0:
+            message = "Currently queueing, position %d. Please wait..." % (position)
+        else:
+            message = (
+                "Currently queueing, position %d. About %d:%02d left..."
+                % (position, eta // 60, eta % 60)
+            )
 
-            while (
-                self.worldQueue.number > self.worldQueue.serving
-                and self.worldQueue.joinSuccess
-            ):
-                if displayQueueing:
-                    self.AddLog("Currently queueing, please wait...")
-                    displayQueueing = False
-
-                self.worldQueue = JoinWorldQueue(
-                    self.worldQueueConfig.worldQueueParam,
-                    self.accNumber,
-                    self.account.ticket,
-                    queueURL,
-                    self.worldQueueConfig.worldQueueURL,
-                    self.valHomeDir,
-                    self.osType,
-                )
+        # Replace the previous queue status rather than adding a new line each update
+        if self.worldQueueStatusShown:
+            cursor = self.winMain.txtStatus.textCursor()
+            cursor.movePosition(QtGui.QTextCursor.End)
+            cursor.select(QtGui.QTextCursor.BlockUnderCursor)
+            cursor.removeSelectedText()
+        self.winMain.txtStatus.append(message)
+        self.worldQueueStatusShown = True
 
-                if not self.worldQueue.joinSuccess:
-                    self.AddLog("[E10] Error getting world status.")
+    def GetWorldQueueResult(self, success):
+        self.winMain.btnLogin.setText("Play")
 
-        if self.worldQueue.joinSuccess:
+        if success:
             self.LaunchGame()
+        elif self.worldQueueThread.isInterruptionRequested():
+            self.AddLog("World queue cancelled")
         else:
             self.AddLog("[E11] Error joining world queue.")
 
@@ -857,6 +962,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.winMain.cboAccount.setCurrentText("")
         self.winMain.txtPassword.setText("")
         self.winMain.cboWorld.clear()
+        self.worldStatusTimer.stop()
         self.ClearLog()
         self.ClearNews()
 
@@ -1022,6 +1128,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.ReturnWorldQueueConfig,
             self.ReturnNews,
         )
+        self.configThread.finished.connect(self.configThreadFinished)
         self.configThread.start()
 
     def GetBaseConfig(self, baseConfig):
@@ -1030,14 +1137,83 @@ class MainWindow(QtWidgets.QMainWindow):
     def GetGLSDataCenter(self, dataCenter):
         self.dataCenter = dataCenter
 
+        # The world list is sent again if the cached one turned out to be outdated
+        selected_world = self.winMain.cboWorld.currentText()
+        self.winMain.cboWorld.clear()
+
         for world in self.dataCenter.worldList:
             self.winMain.cboWorld.addItem(world.name)
 
-        self.setCurrentAccountWorld()
+        if selected_world:
+            self.winMain.cboWorld.setCurrentText(selected_world)
+        else:
+            self.setCurrentAccountWorld()
+
+        self.refreshWorldStatus()
+        self.worldStatusTimer.start()
+
+    def worldStatusTimerTimeout(self):
+        # Periodic refreshes check every world no matter how fresh it is
+        self.refreshWorldStatus(maxAge=0)
+
+    def refreshWorldStatus(self, maxAge=None):
+        """
+        Checks the status of the worlds that weren't checked in the last
+        maxAge seconds. maxAge defaults to WorldStatusThread.STATUS_MAX_AGE.
+        """
+        if self.worldStatusThread:
+            return
+
+        self.worldStatusThread = WorldStatusThread(self)
+        self.worldStatusThread.SetUp(
+            self.dataCenter.worldList,
+            self.valHomeDir,
+            self.osType,
+            self.ReturnWorldStatus,
+            WorldStatusThread.STATUS_MAX_AGE if maxAge is None else maxAge,
+        )
+        self.worldStatusThread.finished.connect(self.worldStatusThreadFinished)
+        self.worldStatusThread.start()
+
+    def worldStatusThreadFinished(self):
+        worldList = self.worldStatusThread.worldList
+        self.worldStatusThread.deleteLater()
+        self.worldStatusThread = None
+
+        # World list was replaced while the old one was being checked
+        if worldList is not self.dataCenter.worldList:
+            self.refreshWorldStatus()
+
+    def GetWorldStatus(self, world):
+        # Status can arrive after the world list was replaced
+        if world not in self.dataCenter.worldList:
+            return
+
+        index = self.dataCenter.worldList.index(world)
+        if world.worldAvailable:
+            queue_depth = world.getQueueDepth()
+            if queue_depth:
+                status = "Online - %s in queue" % queue_depth
+            else:
+                status = "Online"
+            colour = None
+        else:
+            status = "Offline"
+            colour = QtGui.QColor(QtCore.Qt.gray)
+
+        # World names are kept as the item text, because they are saved
+        # in the settings
+        self.winMain.cboWorld.setItemData(index, status, QtCore.Qt.ToolTipRole)
+        self.winMain.cboWorld.setItemData(index, colour, QtCore.Qt.ForegroundRole)
 
     def GetWorldQueueConfig(self, worldQueueConfig):
         self.worldQueueConfig = worldQueueConfig
 
+        # Configuration is sent again if the cached one turned out to be
+        # outdated. The account widgets are only set up the first time.
+        if self.winMain.btnLogin.isEnabled():
+            return
+
         self.winMain.actionPatch.setEnabled(True)
         self.winMain.actionPatch.setVisible(True)
         self.winMain.btnLogin.setEnabled(True)
@@ -1061,8 +1237,6 @@ class MainWindow(QtWidgets.QMainWindow):
     def GetNews(self, news):
         self.winMain.txtFeed.setHtml(news)
 
-        self.configThreadFinished()
-
     def GetConfigDir(self):
         if self.osType.usingWindows:
             config_dir = os.environ.get("APPDATA")
@@ -1102,6 +1276,10 @@ class MainWindow(QtWidgets.QMainWindow):
 
 
 class MainWindowThread(QtCore.QThread):
+    # Cached news older than this isn't shown while the news is refreshed
+    NEWS_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+    RESPONSE_CACHE_MAX_SIZE = 5 * 1024 * 1024
+
     def SetUp(
         self,
         settings,
@@ -1129,9 +1307,102 @@ class MainWindowThread(QtCore.QThread):
         self.ReturnNews = ReturnNews
 
         self.logger = logging.getLogger("OneLauncher")
+        self.responseCache = ResponseCache(
+            os.path.join(self.settings.settingsDir, "cache")
+        )
+        self.dataCenter = None
+        self.worldQueueConfig = None
+        self.cachedNews = None
 
     def run(self):
-        self.LoadLanguageList()
+        # Stages are started as soon as every stage they depend on has
+        # succeeded, so independent network and disk work overlaps.
+        self.responseCache.prune(self.NEWS_CACHE_MAX_AGE, self.RESPONSE_CACHE_MAX_SIZE)
+
+        stages = {
+            "LoadLanguageList": (self.LoadLanguageList, []),
+            "LoadCachedNews": (self.LoadCachedNews, ["LoadLanguageList"]),
+            "LoadLauncherConfig": (self.LoadLauncherConfig, []),
+            "LoadCachedGLSDataCenter": (
+                self.LoadCachedGLSDataCenter,
+                ["LoadLauncherConfig"],
+            ),
+            "AccessGLSDataCenter": (
+                self.AccessGLSDataCenter,
+                ["LoadCachedGLSDataCenter"],
+            ),
+            "LoadCachedWorldQueueConfig": (
+                self.LoadCachedWorldQueueConfig,
+                ["LoadCachedGLSDataCenter", "LoadLanguageList"],
+            ),
+            "GetWorldQueueConfig": (
+                self.GetWorldQueueConfig,
+                ["AccessGLSDataCenter", "LoadCachedWorldQueueConfig"],
+            ),
+            "GetNewsStyleSheet": (self.GetNewsStyleSheet, ["GetWorldQueueConfig"]),
+            "GetNewsFeed": (self.GetNewsFeed, ["GetWorldQueueConfig"]),
+            "GetNews": (
+                self.GetNews,
+                ["GetNewsStyleSheet", "GetNewsFeed", "LoadCachedNews"],
+            ),
+        }
+        self.runStages(stages)
+
+    def runStages(self, stages):
+        """
+        Runs stages from a dictionary of name: (function, dependencies).
+        A stage function returns True on success. Stages whose
+        dependencies fail are skipped.
+        """
+        succeeded = set()
+        finished = set()
+        running = {}
+        pipeline_start = perf_counter()
+
+        with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+            while len(finished) < len(stages):
+                for name, (function, dependencies) in stages.items():
+                    if name in finished or name in running.values():
+                        continue
+
+                    if any(
+                        dependency in finished and dependency not in succeeded
+                        for dependency in dependencies
+                    ):
+                        self.logger.debug("Startup stage %s skipped" % name)
+                        finished.add(name)
+                    elif all(dependency in succeeded for dependency in dependencies):
+                        running[
+                            executor.submit(self.runStage, name, function)
+                        ] = name
+
+                if not running:
+                    # Only possible if a stage depends on one that doesn't exist
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    finished.add(name)
+                    if future.result():
+                        succeeded.add(name)
+
+        self.logger.debug(
+            "Startup pipeline finished in %.3f s" % (perf_counter() - pipeline_start)
+        )
+
+    def runStage(self, name, function):
+        stage_start = perf_counter()
+        try:
+            result = bool(function())
+        except Exception as error:
+            self.logger.error(error, exc_info=True)
+            result = False
+
+        self.logger.debug(
+            "Startup stage %s took %.3f s" % (name, perf_counter() - stage_start)
+        )
+        return result
 
     def LoadLanguageList(self):
         if os.path.exists(self.settings.gameDir):
@@ -1144,80 +1415,175 @@ class MainWindowThread(QtCore.QThread):
 
                 self.ReturnLog.emit("Available languages checked.")
 
-                self.LoadLauncherConfig()
+                return True
             else:
                 self.ReturnLog.emit("[E02] No language files found.")
 
+        return False
+
     def LoadLauncherConfig(self):
         self.baseConfig = BaseConfig(self.configFile)
 
+        if not self.baseConfig.isConfigOK:
+            self.baseConfig = BaseConfig(self.configFileAlt)
+
         if self.baseConfig.isConfigOK:
             self.ReturnBaseConfig.emit(self.baseConfig)
-
-            self.AccessGLSDataCenter(
-                self.baseConfig.GLSDataCenterService, self.baseConfig.gameName
-            )
+            return True
         else:
-            self.baseConfig = BaseConfig(self.configFileAlt)
+            self.ReturnLog.emit("[E03] Error reading launcher configuration file.")
+            return False
 
-            if self.baseConfig.isConfigOK:
-                self.ReturnBaseConfig.emit(self.baseConfig)
+    def LoadCachedGLSDataCenter(self):
+        """Sends the world list from the last run while it is revalidated"""
+        dataCenter = GLSDataCenter(
+            self.baseConfig.GLSDataCenterService,
+            self.baseConfig.gameName,
+            self.baseDir,
+            self.osType,
+            self.responseCache,
+            fromCache=True,
+        )
 
-                self.AccessGLSDataCenter(
-                    self.baseConfig.GLSDataCenterService,
-                    self.baseConfig.gameName,
-                )
-            else:
-                self.ReturnLog.emit("[E03] Error reading launcher configuration file.")
+        if dataCenter.loadSuccess:
+            self.dataCenter = dataCenter
+            self.ReturnGLSDataCenter.emit(self.dataCenter)
+            self.ReturnLog.emit("World list loaded from cache.")
 
-    def AccessGLSDataCenter(self, urlGLS, gameName):
-        self.dataCenter = GLSDataCenter(urlGLS, gameName, self.baseDir, self.osType)
+        # Not having a cached copy isn't an error
+        return True
+
+    def AccessGLSDataCenter(self):
+        dataCenter = GLSDataCenter(
+            self.baseConfig.GLSDataCenterService,
+            self.baseConfig.gameName,
+            self.baseDir,
+            self.osType,
+            self.responseCache,
+        )
 
-        if self.dataCenter.loadSuccess:
+        # Unchanged responses aren't parsed, so the cached copy is used
+        if dataCenter.loadSuccess and not dataCenter.changed and not self.dataCenter:
+            dataCenter = GLSDataCenter(
+                self.baseConfig.GLSDataCenterService,
+                self.baseConfig.gameName,
+                self.baseDir,
+                self.osType,
+                self.responseCache,
+                fromCache=True,
+            )
+
+        if dataCenter.loadSuccess:
             self.ReturnLog.emit("Fetched details from GLS data center.")
+
+            # Cached world list is still current
+            if not dataCenter.changed:
+                return True
+
+            self.dataCenter = dataCenter
             self.ReturnGLSDataCenter.emit(self.dataCenter)
             self.ReturnLog.emit("World list obtained.")
 
-            self.GetWorldQueueConfig(self.dataCenter.launchConfigServer)
+            return True
         else:
             self.ReturnLog.emit("[E04] Error accessing GLS data center.")
+            return False
+
+    def LoadCachedWorldQueueConfig(self):
+        """Sends the launcher configuration from the last run while it is revalidated"""
+        if self.dataCenter:
+            worldQueueConfig = WorldQueueConfig(
+                self.dataCenter.launchConfigServer,
+                self.baseDir,
+                self.osType,
+                self.settings.gameDir,
+                self.settings.client,
+                self.responseCache,
+                fromCache=True,
+            )
+
+            if worldQueueConfig.loadSuccess:
+                self.worldQueueConfig = worldQueueConfig
+
+                if self.worldQueueConfig.message:
+                    self.ReturnLog.emit(self.worldQueueConfig.message)
+
+                self.ReturnWorldQueueConfig.emit(self.worldQueueConfig)
+
+        # Not having a cached copy isn't an error
+        return True
 
-    def GetWorldQueueConfig(self, urlWorldQueueServer):
-        self.worldQueueConfig = WorldQueueConfig(
-            urlWorldQueueServer,
+    def GetWorldQueueConfig(self):
+        worldQueueConfig = WorldQueueConfig(
+            self.dataCenter.launchConfigServer,
             self.baseDir,
             self.osType,
             self.settings.gameDir,
             self.settings.client,
+            self.responseCache,
         )
 
-        if self.worldQueueConfig.message:
-            self.ReturnLog.emit(self.worldQueueConfig.message)
+        # Unchanged responses aren't parsed, so the cached copy is used
+        if (
+            worldQueueConfig.loadSuccess
+            and not worldQueueConfig.changed
+            and not self.worldQueueConfig
+        ):
+            worldQueueConfig = WorldQueueConfig(
+                self.dataCenter.launchConfigServer,
+                self.baseDir,
+                self.osType,
+                self.settings.gameDir,
+                self.settings.client,
+                self.responseCache,
+                fromCache=True,
+            )
 
-        if self.worldQueueConfig.loadSuccess:
+        if worldQueueConfig.loadSuccess:
             self.ReturnLog.emit("World queue configuration read.")
+
+            # Cached configuration is still current
+            if not worldQueueConfig.changed:
+                return True
+
+            self.worldQueueConfig = worldQueueConfig
+
+            if self.worldQueueConfig.message:
+                self.ReturnLog.emit(self.worldQueueConfig.message)
+
             self.ReturnWorldQueueConfig.emit(self.worldQueueConfig)
 
-            self.GetNews()
+            return True
         else:
             self.ReturnLog.emit("[E05] Error getting world queue configuration.")
+            return False
 
-    def GetNews(self):
-        try:
-            href = ""
+    def getNewsCacheKey(self):
+        return "news %s %s" % (self.settings.currentGame, self.settings.language)
 
-            webservice, post = WebConnection(self.worldQueueConfig.newsStyleSheetURL)
+    def LoadCachedNews(self):
+        """Shows the news from the last run while it is refreshed"""
+        self.cachedNews = self.responseCache.get(self.getNewsCacheKey())
 
-            webservice.putrequest("GET", post)
-            webservice.putheader("Accept-Encoding", "gzip")
-            webservice.endheaders()
+        if self.cachedNews and time() - self.cachedNews["stored"] < (
+            self.NEWS_CACHE_MAX_AGE
+        ):
+            self.ReturnNews.emit(self.cachedNews["body"])
+        else:
+            self.cachedNews = None
 
-            webresp = webservice.getresponse()
+        # Not having cached news isn't an error
+        return True
 
-            if webresp.getheader("Content-Encoding", "") == "gzip":
-                tempxml = zlib.decompress(webresp.read(), 16 + zlib.MAX_WBITS)
-            else:
-                tempxml = webresp.read()
+    def GetNewsStyleSheet(self):
+        try:
+            self.newsTimeCode = ""
+
+            tempxml, _ = self.responseCache.request(
+                self.worldQueueConfig.newsStyleSheetURL,
+                self.worldQueueConfig.newsStyleSheetURL,
+                headers={"Accept-Encoding": "gzip"},
+            )
 
             doc = defusedxml.minidom.parseString(tempxml, forbid_entities=False)
 
@@ -1233,23 +1599,16 @@ class MainWindowThread(QtCore.QThread):
                     )
                     if len(timeCode) > 0:
                         timeCode = " %s" % (timeCode)
+                    self.newsTimeCode = timeCode
 
-            links = doc.getElementsByTagName("link")
-            for link in links:
-                if link.nodeType == link.ELEMENT_NODE:
-                    href = link.attributes["href"]
-
-            # Ignore broken href (as of 3/30/16) in the style sheet and use Launcher.
-            # NewsFeedCSSUrl defined in launcher.config
-            href.value = self.worldQueueConfig.newsFeedCSSURL
-
-            HTMLTEMPLATE = '<html><head><link rel="stylesheet" type="text/css" href="'
-            HTMLTEMPLATE += href.value
-            HTMLTEMPLATE += (
-                '"/><base target="_blank"/></head><body><div '
-                'class="launcherNewsItemsContainer" style="width:auto">'
-            )
+            return True
+        except Exception as error:
+            self.ReturnLog.emit("[E12] Error getting news")
+            self.logger.warning(error)
+            return False
 
+    def GetNewsFeed(self):
+        try:
             # DDO test client doesn't provide a news feed, so one from the forums is used.
             if self.settings.currentGame == "DDO.Test":
                 urlNewsFeed = (
@@ -1260,34 +1619,38 @@ class MainWindowThread(QtCore.QThread):
                     "{lang}", self.settings.language.lower()
                 )
 
-            webservice, post = WebConnection(urlNewsFeed)
-
-            webservice.putrequest("GET", post)
-            webservice.putheader("Accept-Encoding", "gzip")
-            webservice.endheaders()
-
-            webresp = webservice.getresponse()
+            self.newsFeed, self.newsFeedChanged = self.responseCache.request(
+                urlNewsFeed, urlNewsFeed, headers={"Accept-Encoding": "gzip"}
+            )
 
-            if webresp.getheader("Content-Encoding", "") == "gzip":
-                tempxml = zlib.decompress(webresp.read(), 16 + zlib.MAX_WBITS)
-            else:
-                tempxml = webresp.read()
+            return True
+        except Exception as error:
+            self.ReturnLog.emit("[E12] Error getting news")
+            self.logger.warning(error)
+            return False
 
-            if len(tempxml) == 0:
-                webservice, post = WebConnection(webresp.getheader("location"))
-                webservice.putrequest("GET", post)
-                webservice.putheader("Accept-Encoding", "gzip")
-                webservice.endheaders()
-                webresp = webservice.getresponse()
+    def GetNews(self):
+        # Cached news is still current
+        if self.cachedNews and not self.newsFeedChanged:
+            return True
 
-                if webresp.getheader("Content-Encoding", "") == "gzip":
-                    tempxml = zlib.decompress(webresp.read(), 16 + zlib.MAX_WBITS)
-                else:
-                    tempxml = webresp.read()
+        try:
+            # Ignore broken href (as of 3/30/16) in the style sheet and use Launcher.
+            # NewsFeedCSSUrl defined in launcher.config
+            HTMLTEMPLATE = '<html><head><link rel="stylesheet" type="text/css" href="'
+            HTMLTEMPLATE += self.worldQueueConfig.newsFeedCSSURL
+            HTMLTEMPLATE += (
+                '"/><base target="_blank"/></head><body><div '
+                'class="launcherNewsItemsContainer" style="width:auto">'
+            )
 
             result = HTMLTEMPLATE
 
-            doc = defusedxml.minidom.parseString(tempxml)
+            doc = defusedxml.minidom.parseString(self.newsFeed)
+
+            # Identifies the set of items in the feed, so the news
+            # is only replaced when items are added or removed.
+            items_hash = hashlib.sha1()  # nosec
 
             items = doc.getElementsByTagName("item")
             for item in items:
@@ -1297,6 +1660,9 @@ class MainWindowThread(QtCore.QThread):
 
                 for node in item.childNodes:
                     if node.nodeType == node.ELEMENT_NODE:
+                        if node.nodeName in ["title", "pubDate", "guid", "link"]:
+                            items_hash.update(GetText(node.childNodes).encode())
+
                         if node.nodeName == "title":
                             title = (
                                 '<font color="gold"><div class="launcherNewsItemTitle">%s</div></font>'
@@ -1314,7 +1680,7 @@ class MainWindowThread(QtCore.QThread):
                                 tempDate[5:7],
                                 tempDate[12:16],
                                 tempDate[17:22],
-                                timeCode,
+                                self.newsTimeCode,
                             )
                             date = (
                                 '<small><i><div align="right"class="launcherNewsItemDate">%s</div></i></small>'
@@ -1330,7 +1696,241 @@ class MainWindowThread(QtCore.QThread):
 
             result += "</div></body></html>"
 
-            self.ReturnNews.emit(result)
+            items_signature = items_hash.hexdigest()
+            self.responseCache.put(
+                self.getNewsCacheKey(), result, items=items_signature
+            )
+
+            if (
+                not self.cachedNews
+                or self.cachedNews.get("items") != items_signature
+            ):
+                self.ReturnNews.emit(result)
+
+            return True
         except Exception as error:
             self.ReturnLog.emit("[E12] Error getting news")
             self.logger.warning(error)
+            return False
+
+
+class WorldQueueThread(QtCore.QThread):
+    """
+    Waits in the world queue. The queue is polled less often when
+    now serving is far away or not moving, and more often as it gets close.
+    """
+
+    MIN_POLL_INTERVAL = 1.0
+    MAX_POLL_INTERVAL = 20.0
+    # Polls that fail in a row before giving up on the queue
+    MAX_POLL_FAILURES = 3
+    # How much each new measurement counts towards the serving rate estimate
+    RATE_SMOOTHING = 0.3
+
+    def SetUp(
+        self,
+        argTemplate,
+        account,
+        ticket,
+        queue,
+        urlIn,
+        baseDir,
+        osType,
+        ReturnLog,
+        ReturnWorldQueueStatus,
+        ReturnWorldQueueResult,
+    ):
+        self.argTemplate = argTemplate
+        self.account = account
+        self.ticket = ticket
+        self.queue = queue
+        self.urlIn = urlIn
+        self.baseDir = baseDir
+        self.osType = osType
+
+        self.ReturnLog = ReturnLog
+        self.ReturnWorldQueueStatus = ReturnWorldQueueStatus
+        self.ReturnWorldQueueResult = ReturnWorldQueueResult
+
+        self.logger = logging.getLogger("OneLauncher")
+
+    def run(self):
+        try:
+            result = self.waitInQueue()
+        except Exception as error:
+            self.ReturnLog.emit("[E10] Error getting world status.")
+            self.logger.error(error, exc_info=True)
+            result = False
+
+        self.ReturnWorldQueueResult.emit(result)
+
+    def joinQueue(self):
+        return JoinWorldQueue(
+            self.argTemplate,
+            self.account,
+            self.ticket,
+            self.queue,
+            self.urlIn,
+            self.baseDir,
+            self.osType,
+        )
+
+    def waitInQueue(self):
+        worldQueue = self.joinQueue()
+        if not worldQueue.joinSuccess:
+            return False
+
+        self.ReturnLog.emit("Joined world queue")
+
+        interval = self.MIN_POLL_INTERVAL
+        rate = 0.0
+        last_serving = None
+        last_poll = monotonic()
+
+        while True:
+            number = parseQueueNumber(worldQueue.number)
+            serving = parseQueueNumber(worldQueue.serving)
+            if number <= serving:
+                return True
+
+            now = monotonic()
+            if last_serving is not None:
+                measured_rate = max(serving - last_serving, 0) / (now - last_poll)
+                rate += self.RATE_SMOOTHING * (measured_rate - rate)
+            last_serving = serving
+            last_poll = now
+
+            position = number - serving
+            if rate > 0:
+                eta = position / rate
+                # Poll a few times before the expected turn
+                interval = min(
+                    max(eta / 4, self.MIN_POLL_INTERVAL), self.MAX_POLL_INTERVAL
+                )
+            else:
+                eta = -1
+                interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+
+            self.ReturnWorldQueueStatus.emit(position, int(eta))
+            self.logger.debug(
+                "World queue position %d, rate %.3f/s, next poll in %.1f s"
+                % (position, rate, interval)
+            )
+
+            worldQueue = self.pollQueue(interval)
+            if worldQueue is None:
+                return False
+
+    def pollQueue(self, interval):
+        """
+        Polls the queue after waiting interval seconds. Failed polls are tried
+        again a few times. Returns None when cancelled or polling keeps failing.
+        """
+        for _ in range(self.MAX_POLL_FAILURES):
+            # Sleep in small steps, so cancelling is quick
+            deadline = monotonic() + interval
+            while monotonic() < deadline:
+                if self.isInterruptionRequested():
+                    return None
+                self.msleep(100)
+
+            # Polls are POSTs, so they usually go out on new connections
+            # instead of pooled ones the server may have closed
+            worldQueue = self.joinQueue()
+            if worldQueue.joinSuccess:
+                return worldQueue
+
+            self.logger.warning("World queue poll failed")
+            interval = self.MIN_POLL_INTERVAL
+
+        self.ReturnLog.emit("[E10] Error getting world status.")
+        return None
+
+
+class LoginThread(QtCore.QThread):
+    """Authenticates the account and checks the world status at the same time"""
+
+    def SetUp(
+        self,
+        urlLoginServer,
+        name,
+        password,
+        game,
+        world,
+        baseDir,
+        osType,
+        ReturnLoginResult,
+    ):
+        self.urlLoginServer = urlLoginServer
+        self.name = name
+        self.password = password
+        self.game = game
+        self.world = world
+        self.baseDir = baseDir
+        self.osType = osType
+
+        self.ReturnLoginResult = ReturnLoginResult
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            world_check = executor.submit(
+                self.world.CheckWorld, self.baseDir, self.osType
+            )
+            self.account = AuthenticateUser(
+                self.urlLoginServer,
+                self.name,
+                self.password,
+                self.game,
+                self.baseDir,
+                self.osType,
+            )
+            self.password = ""
+            world_check.result()
+
+        if not self.isInterruptionRequested():
+            self.ReturnLoginResult.emit(self)
+
+
+class WorldStatusThread(QtCore.QThread):
+    """Checks the status of all worlds at the same time"""
+
+    # Most worlds are checked at once, so a full refresh takes about one round trip
+    MAX_PARALLEL_CHECKS = 16
+    # Seconds a world status is reused by refreshes that aren't periodic,
+    # like when the world list is sent again. It is longer than
+    # MainWindow.WORLD_STATUS_REFRESH_INTERVAL, so statuses from the last
+    # periodic refresh are still used.
+    STATUS_MAX_AGE = 90
+
+    def SetUp(self, worldList, baseDir, osType, ReturnWorldStatus, maxAge):
+        self.worldList = worldList
+        self.baseDir = baseDir
+        self.osType = osType
+        self.maxAge = maxAge
+
+        self.ReturnWorldStatus = ReturnWorldStatus
+
+    def run(self):
+        worlds = [
+            world
+            for world in self.worldList
+            if not world.isStatusFresh(self.maxAge)
+        ]
+        if not worlds:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_CHECKS) as executor:
+            pending = {
+                executor.submit(
+                    world.CheckWorld, self.baseDir, self.osType, saveConfig=False
+                ): world
+                for world in worlds
+            }
+            for future in as_completed(pending):
+                if self.isInterruptionRequested():
+                    # Checks that haven't started are skipped
+                    for other_future in pending:
+                        other_future.cancel()
+                    return
+
+                self.ReturnWorldStatus.emit(pending[future])
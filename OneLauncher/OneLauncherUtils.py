@@ -32,10 +32,18 @@ import defusedxml.minidom
 from xml.sax.saxutils import escape as xml_escape
 import ssl
 import sys
+import threading
+import hashlib
+import json
+import zlib
+import re
+import select
+from shutil import copyfile
+from time import monotonic, time
 
 from codecs import open as uopen
 
-from http.client import HTTPConnection, HTTPSConnection
+from http.client import HTTPConnection, HTTPSConnection, BadStatusLine
 from urllib.parse import quote
 
 if os.name == "nt":
@@ -79,19 +87,304 @@ def checkForCertificates(logger):
         onelauncher_ssl_ctx.load_verify_locations(certfile)
         logger.info("SSL certificate verification enabled!")
 
+    # Pooled HTTPS connections were made with the previous SSL context
+    connection_pool.clear()
 
-def WebConnection(urlIn):
+
+class WebConnectionPool:
+    """
+    Keeps idle keep-alive connections for each host, so requests to
+    the same host don't need a new TCP and TLS handshake every time.
+    """
+
+    # Servers tend to close idle keep-alive connections after a short time
+    IDLE_TIMEOUT = 30
+    # Requests that can't be retried only reuse connections that were idle for
+    # less time than this, because a server closing one can't be detected until
+    # the request has already been sent
+    NON_IDEMPOTENT_IDLE_TIMEOUT = 2
+    MAX_IDLE_PER_HOST = 4
+    # Seconds a blocking connect or read may take before it is abandoned
+    SOCKET_TIMEOUT = 20
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (secure, host) is the key and a list of (connection, last used) is the value
+        self.idle_connections = {}
+
+    def acquire(self, secure, host, idleTimeout=None):
+        """
+        Returns a connection to host and whether it is a reused one.
+        Idle connections are reused when they have been idle for less than
+        idleTimeout seconds and the server hasn't closed them.
+        """
+        if idleTimeout is None:
+            idleTimeout = self.IDLE_TIMEOUT
+
+        now = monotonic()
+        with self.lock:
+            connections = self.idle_connections.get((secure, host), [])
+            while connections:
+                connection, last_used = connections.pop()
+                if now - last_used < idleTimeout and self.isOpen(connection):
+                    return connection, True
+                connection.close()
+
+        if secure:
+            return (
+                HTTPSConnection(  # nosec
+                    host, timeout=self.SOCKET_TIMEOUT, context=onelauncher_ssl_ctx
+                ),
+                False,
+            )
+        else:
+            return HTTPConnection(host, timeout=self.SOCKET_TIMEOUT), False
+
+    def isOpen(self, connection):
+        """
+        Idle connections shouldn't have anything to read. If they do,
+        it's the end of file from the server closing them.
+        """
+        if connection.sock is None:
+            return False
+
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+
+        return not readable
+
+    def release(self, secure, host, connection):
+        """Hands connection back to the pool after its response was fully read"""
+        now = monotonic()
+        with self.lock:
+            self.evictIdle(now)
+
+            connections = self.idle_connections.setdefault((secure, host), [])
+            if len(connections) < self.MAX_IDLE_PER_HOST:
+                connections.append((connection, now))
+            else:
+                connection.close()
+
+    def evictIdle(self, now):
+        """Closes expired idle connections. self.lock must be held."""
+        for key, connections in list(self.idle_connections.items()):
+            for connection, last_used in connections:
+                if now - last_used >= self.IDLE_TIMEOUT:
+                    connection.close()
+            connections[:] = [
+                (connection, last_used)
+                for connection, last_used in connections
+                if now - last_used < self.IDLE_TIMEOUT
+            ]
+            if not connections:
+                del self.idle_connections[key]
+
+    def clear(self):
+        with self.lock:
+            for connections in self.idle_connections.values():
+                for connection, _ in connections:
+                    connection.close()
+            self.idle_connections = {}
+
+
+connection_pool = WebConnectionPool()
+
+
+def splitUrl(urlIn):
+    """Returns if urlIn uses HTTPS, its host, and the rest of the URL"""
     if urlIn.upper().find("HTTP://") >= 0:
         url = urlIn[7:].split("/")[0]
         post = urlIn[7:].replace(url, "")
-        return HTTPConnection(url), post
+        return False, url, post
     else:
         url = urlIn[8:].split("/")[0]
         post = urlIn[8:].replace(url, "")
-        return (
-            HTTPSConnection(url, context=onelauncher_ssl_ctx),  # nosec
-            post,
-        )
+        return True, url, post
+
+
+# Requests that can be sent again without changing what the server does
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def WebRequest(urlIn, method="GET", body=None, headers=None):
+    """
+    Sends a request over a pooled keep-alive connection and returns
+    the response along with its body. A request that fails on a reused
+    connection the server has already closed is retried on a new one.
+    Requests that aren't idempotent, like logins, are only retried if
+    they failed before being sent, since the server may have already
+    handled them. They only reuse connections that were released moments
+    ago, so they rarely go out on one the server has closed.
+    """
+    secure, url, post = splitUrl(urlIn)
+    idempotent = method in IDEMPOTENT_METHODS
+    idle_timeout = None if idempotent else connection_pool.NON_IDEMPOTENT_IDLE_TIMEOUT
+
+    while True:
+        webservice, reused = connection_pool.acquire(secure, url, idle_timeout)
+        sent = False
+        try:
+            webservice.putrequest(method, post)
+            for header, value in (headers or {}).items():
+                webservice.putheader(header, value)
+            if body is not None:
+                webservice.putheader("Content-length", "%d" % len(body))
+            webservice.endheaders()
+            if body is not None:
+                webservice.send(body)
+            sent = True
+
+            webresp = webservice.getresponse()
+            data = webresp.read()
+        except (BadStatusLine, ConnectionError):
+            webservice.close()
+            if reused and (idempotent or not sent):
+                continue
+            raise
+        except:
+            webservice.close()
+            raise
+
+        if webresp.will_close:
+            webservice.close()
+        else:
+            connection_pool.release(secure, url, webservice)
+
+        return webresp, data
+
+
+class ResponseCache:
+    """
+    On-disk cache for web responses. Entries keep the ETag and
+    Last-Modified validators of the response they came from, so they can
+    be shown right away and revalidated later with conditional requests.
+    """
+
+    # Seconds a response is used without revalidating it when
+    # the server doesn't send a Cache-Control max-age
+    DEFAULT_MAX_AGE = 0
+
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+
+    def getEntryPath(self, key):
+        name = hashlib.sha1(string_encode(key)).hexdigest()  # nosec
+        return os.path.join(self.cacheDir, name + ".json")
+
+    def get(self, key):
+        """Returns cache entry dictionary for key or None if there isn't one"""
+        try:
+            with uopen(self.getEntryPath(key), "r", "utf-8") as infile:
+                return json.load(infile)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, body, webresp=None, oldEntry=None, **extra):
+        """
+        Stores body under key along with the validators and max age
+        from webresp. Validators from oldEntry are kept if webresp
+        doesn't have new ones. extra values are stored with the entry.
+        """
+        entry = dict(oldEntry or {})
+        entry.update(extra)
+        entry["body"] = body
+        entry["stored"] = time()
+        entry["max_age"] = self.getMaxAge(webresp)
+        if webresp:
+            entry["etag"] = webresp.getheader("ETag", entry.get("etag", ""))
+            entry["last_modified"] = webresp.getheader(
+                "Last-Modified", entry.get("last_modified", "")
+            )
+
+        os.makedirs(self.cacheDir, exist_ok=True)
+        entry_path = self.getEntryPath(key)
+        # Write to a temporary file first, so readers never see a partial entry
+        temp_path = "%s.%d.tmp" % (entry_path, threading.get_ident())
+        with uopen(temp_path, "w", "utf-8") as outfile:
+            json.dump(entry, outfile)
+        os.replace(temp_path, entry_path)
+
+        return entry
+
+    def getMaxAge(self, webresp):
+        if webresp:
+            for directive in webresp.getheader("Cache-Control", "").split(","):
+                directive = directive.strip().lower()
+                if directive.startswith("max-age="):
+                    try:
+                        return int(directive[8:])
+                    except ValueError:
+                        break
+
+        return self.DEFAULT_MAX_AGE
+
+    def isFresh(self, entry):
+        return time() - entry.get("stored", 0) < entry.get("max_age", 0)
+
+    def prune(self, maxAge, maxSize):
+        """
+        Removes entries stored more than maxAge seconds ago and then the
+        oldest entries until the cache takes up at most maxSize bytes.
+        """
+        try:
+            entries = [
+                entry for entry in os.scandir(self.cacheDir) if entry.is_file()
+            ]
+        except OSError:
+            return
+
+        now = time()
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        total_size = 0
+        for entry in entries:
+            total_size += entry.stat().st_size
+            if now - entry.stat().st_mtime > maxAge or total_size > maxSize:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def request(self, key, urlIn, method="GET", body=None, headers=None):
+        """
+        Returns the text of the response for urlIn and whether it changed
+        from the cached copy. Fresh cache entries are returned without a
+        request. Stale ones are revalidated with a conditional request.
+        """
+        entry = self.get(key)
+        if entry and self.isFresh(entry):
+            return entry["body"], False
+
+        headers = dict(headers or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        webresp, data = WebRequest(urlIn, method, body, headers)
+
+        location = webresp.getheader("Location")
+        if webresp.status in (301, 302, 303, 307, 308) and location:
+            webresp, data = WebRequest(location, method, body, headers)
+
+        if entry and webresp.status == 304:
+            self.put(key, entry["body"], webresp, entry)
+            return entry["body"], False
+
+        if webresp.getheader("Content-Encoding", "") == "gzip":
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        text = string_decode(data)
+
+        # Error responses are not cached
+        if webresp.status != 200:
+            return text, True
+
+        changed = not entry or entry["body"] != text
+        self.put(key, text, webresp, entry if not changed else None)
+
+        return text, changed
 
 
 def GetText(nodelist):
@@ -102,6 +395,77 @@ def GetText(nodelist):
     )
 
 
+def parseQueueNumber(number):
+    """Queue numbers are hexadecimal strings like 0x0000001A"""
+    return int(number, 16) if number.lower().startswith("0x") else int(number)
+
+
+class ArchiveCache:
+    """
+    On-disk store of downloaded archives that takes up at most maxSize
+    bytes. The least recently used archives are removed first. Archive
+    files are named after their key, so a cache folder can be copied to
+    other computers or settings folders to seed them.
+    """
+
+    def __init__(self, cacheDir, maxSize):
+        self.cacheDir = cacheDir
+        self.maxSize = maxSize
+
+    def getArchivePath(self, key):
+        name = re.sub(r"[^\w.-]", "_", key)
+        return os.path.join(self.cacheDir, name + ".zip")
+
+    def get(self, key, path):
+        """Copies archive for key to path. Returns False if there isn't one."""
+        archive_path = self.getArchivePath(key)
+        try:
+            copyfile(archive_path, path)
+            # Modification time is when the archive was last used
+            os.utime(archive_path)
+        except OSError:
+            return False
+
+        return True
+
+    def put(self, key, path):
+        """Stores a copy of the archive at path under key"""
+        os.makedirs(self.cacheDir, exist_ok=True)
+        archive_path = self.getArchivePath(key)
+        # Copy to a temporary file first, so readers never see a partial archive
+        temp_path = "%s.%d.tmp" % (archive_path, threading.get_ident())
+        copyfile(path, temp_path)
+        os.replace(temp_path, archive_path)
+
+        self.prune()
+
+    def remove(self, key):
+        """Removes the archive for key, if there is one"""
+        try:
+            os.remove(self.getArchivePath(key))
+        except OSError:
+            pass
+
+    def prune(self):
+        """Removes the least recently used archives over maxSize bytes"""
+        try:
+            entries = [
+                entry for entry in os.scandir(self.cacheDir) if entry.is_file()
+            ]
+        except OSError:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        total_size = 0
+        for entry in entries:
+            total_size += entry.stat().st_size
+            if total_size > self.maxSize:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
 class BaseConfig:
     def __init__(self, configFile):
         self.GLSDataCenterService = ""
@@ -206,7 +570,23 @@ class DetermineOS:
 
 
 class GLSDataCenter:
-    def __init__(self, urlGLSDataCenterService, gameName, baseDir, osType):
+    """
+    Gets the data center details for gameName. When responseCache is given
+    the response is revalidated against the cached one, and changed is False
+    if it is the same. Details are only parsed if the response changed.
+    Nothing is requested when fromCache is True and only the cached
+    response is used.
+    """
+
+    def __init__(
+        self,
+        urlGLSDataCenterService,
+        gameName,
+        baseDir,
+        osType,
+        responseCache=None,
+        fromCache=False,
+    ):
         SM_TEMPLATE = '<?xml version="1.0" encoding="utf-8"?>\
 <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
 <soap:Body><GetDatacenters xmlns="http://www.turbine.com/SE/GLS"><game>%s</game>\
@@ -214,29 +594,39 @@ class GLSDataCenter:
 
         SoapMessage = SM_TEMPLATE % (gameName)
 
+        self.changed = True
+
         try:
             msg = string_encode(SoapMessage)
-            webservice, post = WebConnection(urlGLSDataCenterService)
-
-            webservice.putrequest("POST", post)
-            webservice.putheader("Content-type", 'text/xml; charset="UTF-8"')
-            webservice.putheader("Content-length", "%d" % len(msg))
-            webservice.putheader(
-                "SOAPAction", "http://www.turbine.com/SE/GLS/GetDatacenters"
-            )
-            webservice.endheaders()
-            webservice.send(msg)
-
-            webresp = webservice.getresponse()
-
-            tempxml = string_decode(webresp.read())
+            # The SOAP message is part of the key, since it has the game name in it
+            cache_key = urlGLSDataCenterService + SoapMessage
+            headers = {
+                "Content-type": 'text/xml; charset="UTF-8"',
+                "SOAPAction": "http://www.turbine.com/SE/GLS/GetDatacenters",
+            }
+
+            if fromCache:
+                entry = responseCache.get(cache_key)
+                tempxml = entry["body"] if entry else ""
+            elif responseCache:
+                tempxml, self.changed = responseCache.request(
+                    cache_key, urlGLSDataCenterService, "POST", msg, headers
+                )
+            else:
+                webresp, data = WebRequest(
+                    urlGLSDataCenterService, "POST", msg, headers
+                )
+                tempxml = string_decode(data)
 
-            filename = "%s%sGLSDataCenter.config" % (baseDir, osType.appDir)
-            with uopen(filename, "w", "utf-8") as outfile:
-                outfile.write(tempxml)
+            if not fromCache:
+                filename = "%s%sGLSDataCenter.config" % (baseDir, osType.appDir)
+                with uopen(filename, "w", "utf-8") as outfile:
+                    outfile.write(tempxml)
 
             if tempxml == "":
                 self.loadSuccess = False
+            elif not self.changed:
+                self.loadSuccess = True
             else:
                 doc = defusedxml.minidom.parseString(tempxml)
 
@@ -293,54 +683,115 @@ class World:
         self.urlServerStatus = urlServerStatus
         self.worldAvailable = False
         self.nowServing = ""
+        self.lastAssigned = ""
         self.loginServer = ""
         self.queueURL = ""
-
-    def CheckWorld(self, baseDir, osType):
+        # monotonic() time of the last status check
+        self.lastChecked = None
+        # Held while the status attributes are set or read together
+        self.lock = threading.Lock()
+
+    def CheckWorld(self, baseDir, osType, saveConfig=True):
+        """
+        Gets the world status. saveConfig=False skips writing it to
+        server.config, which is used when many worlds are checked at once.
+        Worlds are checked from several threads, so the status is read
+        into local variables first and then set all at once.
+        """
+        worldAvailable = False
+        nowServing = ""
+        lastAssigned = ""
+        queueURL = ""
+        loginServer = ""
         try:
-            webservice, post = WebConnection(self.urlServerStatus)
+            webresp, data = WebRequest(self.urlServerStatus)
 
-            webservice.putrequest("GET", post)
-            webservice.endheaders()
-
-            webresp = webservice.getresponse()
+            tempxml = string_decode(data)
 
-            tempxml = string_decode(webresp.read())
+            if saveConfig:
+                filename = "%s%sserver.config" % (baseDir, osType.appDir)
+                with uopen(filename, "w", "utf-8") as outfile:
+                    outfile.write(tempxml)
 
-            filename = "%s%sserver.config" % (baseDir, osType.appDir)
-            with uopen(filename, "w", "utf-8") as outfile:
-                outfile.write(tempxml)
-
-            if tempxml == "":
-                self.worldAvailable = False
-            else:
+            if tempxml != "":
                 doc = defusedxml.minidom.parseString(tempxml)
 
                 try:
-                    self.nowServing = GetText(
+                    nowServing = GetText(
                         doc.getElementsByTagName("nowservingqueuenumber")[0].childNodes
                     )
                 except:
-                    self.nowServing = ""
+                    nowServing = ""
 
                 try:
-                    self.queueURL = GetText(
+                    lastAssigned = GetText(
+                        doc.getElementsByTagName("lastassignedqueuenumber")[0].childNodes
+                    )
+                except:
+                    lastAssigned = ""
+
+                try:
+                    queueURL = GetText(
                         doc.getElementsByTagName("queueurls")[0].childNodes
                     ).split(";")[0]
                 except:
-                    self.queueURL = ""
+                    queueURL = ""
 
-                self.loginServer = GetText(
+                loginServer = GetText(
                     doc.getElementsByTagName("loginservers")[0].childNodes
                 ).split(";")[0]
 
-                self.worldAvailable = True
+                worldAvailable = True
         except:
-            self.worldAvailable = False
+            worldAvailable = False
+
+        with self.lock:
+            self.worldAvailable = worldAvailable
+            if worldAvailable:
+                self.nowServing = nowServing
+                self.lastAssigned = lastAssigned
+                self.queueURL = queueURL
+                self.loginServer = loginServer
+            self.lastChecked = monotonic()
+
+    def getQueueDepth(self):
+        """
+        Returns the number of players waiting to get in or None if the
+        server doesn't report it
+        """
+        with self.lock:
+            nowServing = self.nowServing
+            lastAssigned = self.lastAssigned
+
+        try:
+            return max(
+                parseQueueNumber(lastAssigned) - parseQueueNumber(nowServing), 0,
+            )
+        except ValueError:
+            return None
+
+    def isStatusFresh(self, maxAge):
+        with self.lock:
+            lastChecked = self.lastChecked
+        return lastChecked is not None and monotonic() - lastChecked < maxAge
 
 
 class WorldQueueConfig:
-    def __init__(self, urlConfigServer, baseDir, osType, gameDir, clientType):
+    """
+    Gets the launcher configuration. responseCache and fromCache
+    work the same way as they do for GLSDataCenter.
+    """
+
+    def __init__(
+        self,
+        urlConfigServer,
+        baseDir,
+        osType,
+        gameDir,
+        clientType,
+        responseCache=None,
+        fromCache=False,
+    ):
         self.gameClientFilename = ""
         self.gameClientArgTemplate = ""
         self.crashreceiver = ""
@@ -355,23 +806,31 @@ class WorldQueueConfig:
         self.patchProductCode = ""
         self.worldQueueURL = ""
         self.worldQueueParam = ""
+        self.message = ""
+        self.changed = True
 
         try:
-            webservice, post = WebConnection(urlConfigServer)
-
-            webservice.putrequest("GET", post)
-            webservice.endheaders()
-
-            webresp = webservice.getresponse()
-
-            tempxml = string_decode(webresp.read())
+            if fromCache:
+                entry = responseCache.get(urlConfigServer)
+                tempxml = entry["body"] if entry else ""
+            elif responseCache:
+                tempxml, self.changed = responseCache.request(
+                    urlConfigServer, urlConfigServer
+                )
+            else:
+                webresp, data = WebRequest(urlConfigServer)
+                tempxml = string_decode(data)
 
-            filename = "%s%slauncher.config" % (baseDir, osType.appDir)
-            with uopen(filename, "w", "utf-8") as outfile:
-                outfile.write(tempxml)
+            if not fromCache:
+                filename = "%s%slauncher.config" % (baseDir, osType.appDir)
+                with uopen(filename, "w", "utf-8") as outfile:
+                    outfile.write(tempxml)
 
             if tempxml == "":
                 self.loadSuccess = False
+            elif not self.changed:
+                self.loadSuccess = True
+                return
             else:
                 doc = defusedxml.minidom.parseString(tempxml)
 
@@ -484,25 +943,22 @@ xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
 
         try:
             msg = string_encode(SoapMessage)
-            webservice, post = WebConnection(urlLoginServer)
-
-            webservice.putrequest("POST", post)
-            webservice.putheader("Content-type", 'text/xml; charset="UTF-8"')
-            webservice.putheader("Content-length", "%d" % len(msg))
-            webservice.putheader(
-                "SOAPAction", "http://www.turbine.com/SE/GLS/LoginAccount"
+            webresp, data = WebRequest(
+                urlLoginServer,
+                "POST",
+                msg,
+                {
+                    "Content-type": 'text/xml; charset="UTF-8"',
+                    "SOAPAction": "http://www.turbine.com/SE/GLS/LoginAccount",
+                },
             )
-            webservice.endheaders()
-            webservice.send(msg)
-
-            webresp = webservice.getresponse()
 
             self.gameList = []
 
             activeAccount = False
             self.ticket = ""
 
-            tempxml = string_decode(webresp.read())
+            tempxml = string_decode(data)
 
             filename = "%s%sGLSAuthServer.config" % (baseDir, osType.appDir)
             with uopen(filename, "w", "utf-8") as outfile:
@@ -558,8 +1014,6 @@ xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
 class JoinWorldQueue:
     def __init__(self, argTemplate, account, ticket, queue, urlIn, baseDir, osType):
         try:
-            webservice, post = WebConnection(urlIn)
-
             argComplete = (
                 argTemplate.replace("{0}", account)
                 .replace("{1}", quote(ticket))
@@ -567,18 +1021,17 @@ class JoinWorldQueue:
             )
 
             msg = string_encode(argComplete)
-            webservice.putrequest("POST", post)
-            webservice.putheader("Content-type", "application/x-www-form-urlencoded")
-            webservice.putheader("Content-length", "%d" % len(msg))
-            webservice.putheader(
-                "SOAPAction", "http://www.turbine.com/SE/GLS/LoginAccount"
+            webresp, data = WebRequest(
+                urlIn,
+                "POST",
+                msg,
+                {
+                    "Content-type": "application/x-www-form-urlencoded",
+                    "SOAPAction": "http://www.turbine.com/SE/GLS/LoginAccount",
+                },
             )
-            webservice.endheaders()
-            webservice.send(msg)
-
-            webresp = webservice.getresponse()
 
-            tempxml = string_decode(webresp.read())
+            tempxml = string_decode(data)
 
             filename = "%s%sWorldQueue.config" % (baseDir, osType.appDir)
             with uopen(filename, "w", "utf-8") as outfile:
@@ -0,0 +1,188 @@
+# coding=utf-8
+###########################################################################
+# Benchmark for reading the metadata of installed plugins.
+#
+# Creates a synthetic Plugins folder with 1,000 add-ons, half of them with a
+# .plugincompendium file, and times AddonManager.getAddonFilesMetadata with
+# the files parsed one after another, with the process pool, with the shipped
+# AddonManager.PARALLEL_PARSE_MIN_FILES, and with an up to date file index.
+# Also shows how parsing scales with the number of worker processes, and at
+# which number of files the process pool gets faster.
+#
+# Usage: python benchmarks/addon_files_parse_benchmark.py [addons]
+#
+# This file is part of OneLauncher
+#
+# OneLauncher is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# OneLauncher is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OneLauncher.  If not, see <http://www.gnu.org/licenses/>.
+###########################################################################
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OneLauncher.AddonFiles import parseAddonFile  # noqa: E402
+from OneLauncher.AddonManager import AddonManager  # noqa: E402
+
+PLUGIN_FILE = """<?xml version="1.0"?>
+<Plugin>
+    <Information>
+        <Name>Plugin {i}</Name>
+        <Author>Author {author}</Author>
+        <Version>1.{i}</Version>
+        <Description>Synthetic plugin number {i} for benchmarking.</Description>
+        <Image>Author{author}/Plugin{i}/Resources/Icon.tga</Image>
+    </Information>
+    <Package>Author{author}.Plugin{i}.Main</Package>
+    <Configuration Apartment="Plugin{i}" />
+</Plugin>
+"""
+
+COMPENDIUM_FILE = """<?xml version="1.0"?>
+<PluginConfig>
+    <Id>{i}</Id>
+    <Name>Plugin {i}</Name>
+    <Version>1.{i}</Version>
+    <Author>Author {author}</Author>
+    <InfoUrl>https://www.lotrointerface.com/downloads/info{i}</InfoUrl>
+    <DownloadUrl>https://www.lotrointerface.com/downloads/download{i}</DownloadUrl>
+    <Descriptors>
+        <descriptor>Author{author}\\Plugin{i}.plugin</descriptor>
+    </Descriptors>
+    <Dependencies>
+        <dependency>0</dependency>
+    </Dependencies>
+</PluginConfig>
+"""
+
+
+def createPluginsFolder(folder, count):
+    """Returns (file, tag) pairs for a new Plugins folder with count addons"""
+    files_tags = []
+    for i in range(count):
+        author = i % 200
+        author_folder = os.path.join(folder, "Author%s" % author)
+        os.makedirs(os.path.join(author_folder, "Plugin%s" % i), exist_ok=True)
+
+        plugin = os.path.join(author_folder, "Plugin%s.plugin" % i)
+        with open(plugin, "w") as file:
+            file.write(PLUGIN_FILE.format(i=i, author=author))
+        files_tags.append((plugin, "Information"))
+
+        if i % 2:
+            compendium = os.path.join(author_folder, "Plugin%s.plugincompendium" % i)
+            with open(compendium, "w") as file:
+                file.write(COMPENDIUM_FILE.format(i=i, author=author))
+            files_tags.append((compendium, "PluginConfig"))
+
+    return files_tags
+
+
+def getAddonManager(settingsDir):
+    # The UI isn't needed for reading addon files
+    addon_manager = AddonManager.__new__(AddonManager)
+    addon_manager.settingsDir = settingsDir
+    addon_manager.openDB()
+    return addon_manager
+
+
+def benchmark(name, files_tags, min_parallel_files=None, warm=False):
+    """
+    Uses the shipped PARALLEL_PARSE_MIN_FILES and PARALLEL_PARSE_MIN_CPUS when
+    min_parallel_files is None. Otherwise the pool is used for at least
+    min_parallel_files files, whatever the number of CPUs.
+    """
+    with TemporaryDirectory() as settingsDir:
+        addon_manager = getAddonManager(settingsDir)
+        if min_parallel_files is not None:
+            addon_manager.PARALLEL_PARSE_MIN_FILES = min_parallel_files
+            addon_manager.PARALLEL_PARSE_MIN_CPUS = 1
+        if warm:
+            addon_manager.getAddonFilesMetadata(files_tags)
+
+        start = perf_counter()
+        addon_manager.getAddonFilesMetadata(files_tags)
+        elapsed = perf_counter() - start
+
+        addon_manager.closeDB()
+
+    print(
+        "%-10s %5d files in %.3f s  %8.0f files/s"
+        % (name, len(files_tags), elapsed, len(files_tags) / elapsed)
+    )
+    return elapsed
+
+
+def benchmarkWorkers(files_tags):
+    files = [file for file, _ in files_tags]
+    tags = [tag for _, tag in files_tags]
+
+    max_workers = os.cpu_count() or 1
+    workers_counts = []
+    workers = 1
+    while workers < max_workers:
+        workers_counts.append(workers)
+        workers *= 2
+    workers_counts.append(max_workers)
+
+    for workers in workers_counts:
+        start = perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            chunksize = max(len(files) // (workers * 4), 1)
+            for _ in executor.map(parseAddonFile, files, tags, chunksize=chunksize):
+                pass
+        elapsed = perf_counter() - start
+
+        print("%2d workers %5d files in %.3f s" % (workers, len(files), elapsed))
+
+
+def benchmarkCrossover(max_count):
+    """Compares serial and process pool parsing for growing numbers of addons"""
+    print(
+        "Shipped PARALLEL_PARSE_MIN_FILES is %d" % AddonManager.PARALLEL_PARSE_MIN_FILES
+    )
+    count = 250
+    while count <= max_count:
+        with TemporaryDirectory() as plugins_folder:
+            files_tags = createPluginsFolder(plugins_folder, count)
+            serial = benchmark("serial", files_tags, len(files_tags) + 1)
+            parallel = benchmark("parallel", files_tags, 1)
+            print("pool is   %.2fx as fast\n" % (serial / parallel))
+        count *= 2
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    with TemporaryDirectory() as plugins_folder:
+        files_tags = createPluginsFolder(plugins_folder, count)
+
+        serial = benchmark("serial", files_tags, len(files_tags) + 1)
+        parallel = benchmark("parallel", files_tags, 1)
+        benchmark("shipped", files_tags)
+        benchmark("indexed", files_tags, warm=True)
+        print("speedup    %.1fx with %d CPUs\n" % (serial / parallel, os.cpu_count()))
+
+        benchmarkWorkers(files_tags)
+
+    print()
+    benchmarkCrossover(count * 4)
+
+
+if __name__ == "__main__":
+    main()
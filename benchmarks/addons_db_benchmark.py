@@ -0,0 +1,139 @@
+# coding=utf-8
+###########################################################################
+# Benchmark for writing add-on rows to the addons_cache database.
+#
+# Inserts catalog rows the way AddonManager used to (one INSERT per row with
+# the default journal settings) and the way it does now (executemany in one
+# transaction on a WAL database) and reports rows per second for both.
+#
+# Usage: python benchmarks/addons_db_benchmark.py [rows]
+#
+# This file is part of OneLauncher
+#
+# OneLauncher is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# OneLauncher is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with OneLauncher.  If not, see <http://www.gnu.org/licenses/>.
+###########################################################################
+import os
+import sqlite3
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from OneLauncher.AddonManager import AddonManager  # noqa: E402
+
+
+class Table:
+    """Stands in for the QTableWidget AddonManager gets table names from"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def objectName(self):
+        return self.name
+
+
+def getCatalogRows(count):
+    rows = []
+    for i in range(count):
+        rows.append(
+            [
+                "Addon %s" % i,
+                "Category %s" % (i % 20),
+                "1.%s" % i,
+                "Author %s" % (i % 500),
+                "2020-01-01",
+                "https://www.lotrointerface.com/downloads/download%s" % i,
+                str(i),
+                "",
+                "",
+            ]
+        )
+    return rows
+
+
+def getAddonManager(settingsDir):
+    # The UI isn't needed for database writes
+    addon_manager = AddonManager.__new__(AddonManager)
+    addon_manager.settingsDir = settingsDir
+    addon_manager.openDB()
+    return addon_manager
+
+
+def setUpOld(addon_manager):
+    """Default journal settings, like before"""
+    # Journal mode can only be changed back without other connections
+    addon_manager.closeDB()
+    conn = sqlite3.connect(addon_manager.addons_cache_db_path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA synchronous=FULL")
+    addon_manager.conn = conn
+    addon_manager.c = conn.cursor()
+
+
+def insertRowsOld(addon_manager, table, rows):
+    """Per row INSERT, like before"""
+    for row in rows:
+        question_marks = "?"
+        for _ in range(len(row) - 1):
+            question_marks += ",?"
+
+        addon_manager.c.execute(
+            "INSERT INTO {table} VALUES({})".format(  # nosec
+                question_marks, table=table.objectName()
+            ),
+            row,
+        )
+    addon_manager.conn.commit()
+
+
+def setUpNew(addon_manager):
+    pass
+
+
+def insertRowsNew(addon_manager, table, rows):
+    with addon_manager.conn:
+        addon_manager.addRowsToDB(table, rows)
+
+
+def benchmark(name, set_up_function, insert_function, rows):
+    with TemporaryDirectory() as settingsDir:
+        addon_manager = getAddonManager(settingsDir)
+        set_up_function(addon_manager)
+        table = Table("tablePlugins")
+
+        # Only the inserts and their commit are timed for both
+        start = perf_counter()
+        insert_function(addon_manager, table, rows)
+        elapsed = perf_counter() - start
+
+        addon_manager.closeDB()
+
+    print(
+        "%-8s %6d rows in %.3f s  %10.0f rows/s"
+        % (name, len(rows), elapsed, len(rows) / elapsed)
+    )
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows = getCatalogRows(count)
+
+    old = benchmark("before", setUpOld, insertRowsOld, rows)
+    new = benchmark("after", setUpNew, insertRowsNew, rows)
+    print("speedup  %.1fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()